@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dependencyinjection as di
+
+def measure(name, func, number=1):
+    begin = time.perf_counter()
+    for _ in range(number):
+        result = func()
+    elapsed = time.perf_counter() - begin
+    print('{:<48} {:>10.3f} ms'.format(name, elapsed * 1000 / number))
+    return result
+
+def make_types(count):
+    return [type(f'S{i}', (), {}) for i in range(count)]
+
+def bench_register(count=10000):
+    types = make_types(count)
+
+    def register_one_by_one():
+        service = di.Services()
+        for t in types:
+            service.singleton(t)
+        return service
+
+    def register_many():
+        return di.Services().add_many((t, None, 'singleton') for t in types)
+
+    measure(f'register {count} services one by one', register_one_by_one)
+    service = measure(f'register {count} services by add_many', register_many)
+    provider = measure(f'build {count} services', service.build)
+    measure(f'resolve {count} services (first)', lambda: [provider.get(t) for t in types])
+    measure(f'resolve {count} services (cached)', lambda: [provider.get(t) for t in types])
+
+def measure_memory(name, func, count):
+    gc.collect()
+    tracemalloc.start()
+    begin = tracemalloc.take_snapshot()
+    result = func()
+    gc.collect()
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(x.size_diff for x in end.compare_to(begin, 'filename'))
+    print('{:<48} {:>10.1f} B'.format(name, size / count))
+    return result
+
+def bench_memory(count=10000):
+    types = make_types(count)
+
+    class Scoped:
+        pass
+
+    def build():
+        service = di.Services().add_many((t, None, 'transient') for t in types)
+        service.scoped(Scoped)
+        provider = service.build()
+        provider.compile()
+        return provider
+
+    provider = measure_memory('bytes per registration (built and compiled)', build, count)
+    def open_scopes():
+        scopes = [provider.scope() for _ in range(count)]
+        for scope in scopes:
+            for t in types[:10]:
+                scope.get(t)
+            scope.get(Scoped)
+        return scopes
+    scopes = measure_memory('bytes per open scope (resolved 11 services)', open_scopes, count)
+    for scope in scopes:
+        scope.__exit__(None, None, None)
+
+def bench_transients(number=100000):
+    class Config:
+        pass
+    class Db:
+        pass
+    class Cache:
+        pass
+    class Request:
+        pass
+    class Repository:
+        def __init__(self, config: Config, db: Db, cache: Cache):
+            pass
+    class Handler:
+        def __init__(self, repo: Repository, config: Config, db: Db, request: Request):
+            pass
+
+    service = di.Services()
+    service.singleton(Config).singleton(Db).singleton(Cache).scoped(Request)
+    service.transient(Repository).transient(Handler)
+    for name, provider in (('', service.build()), (' (thread safety)', service.threadsafety().build())):
+        with provider.scope() as scoped_provider:
+            scoped_provider.get(Handler)
+            begin = time.perf_counter()
+            for _ in range(number):
+                scoped_provider.get(Handler)
+            elapsed = time.perf_counter() - begin
+        print('{:<48} {:>10.3f} us'.format(f'resolve transient graph{name}', elapsed * 1000000 / number))
+
+def bench_scopes(number=100000):
+    class Request:
+        pass
+
+    for name, service in (('', di.Services()), (' (scope pool)', di.Services().scope_pool())):
+        provider = service.scoped(Request).build()
+        def run():
+            for _ in range(number):
+                with provider.scope() as scoped_provider:
+                    scoped_provider.get(Request)
+        begin = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - begin
+        print('{:<48} {:>10.3f} us'.format(f'open scope and resolve{name}', elapsed * 1000000 / number))
+
+def bench_threads(number=20000):
+    import threading
+
+    class Config:
+        pass
+
+    class Session:
+        def __init__(self, config: Config):
+            self.config = config
+
+    class Handler:
+        def __init__(self, session: Session, config: Config):
+            self.session = session
+
+    provider = di.Services().threadsafety().singleton(Config).scoped(Session).transient(Handler).build()
+
+    def run():
+        with provider.scope() as scoped_provider:
+            for _ in range(number):
+                scoped_provider.get(Handler)
+
+    gil = 'enabled' if getattr(sys, '_is_gil_enabled', lambda: True)() else 'disabled'
+    for threads_count in (1, 2, 4, 8, 16):
+        threads = [threading.Thread(target=run) for _ in range(threads_count)]
+        begin = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - begin
+        print('{:<48} {:>10.0f} /s'.format(f'resolve on {threads_count} threads (gil {gil})',
+                                           threads_count * number / elapsed))
+
+def bench_internal(number=100000, count=2000):
+    from dependencyinjection.internal.common import IServiceProvider
+
+    provider = di.Services().build()
+    def open_scopes():
+        for _ in range(number):
+            with provider.scope():
+                pass
+    def get_provider():
+        for _ in range(number):
+            provider.get(IServiceProvider)
+    for name, func in (('open scope', open_scopes), ('resolve IServiceProvider', get_provider)):
+        begin = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - begin
+        print('{:<48} {:>10.3f} us'.format(name, elapsed * 1000000 / number))
+
+    types = make_types(count)
+    for t in types:
+        t.__init__ = lambda self, x: None
+        t.__init__.__annotations__['x'] = IServiceProvider
+    provider = di.Services().add_many((t, None, 'transient') for t in types).build()
+    measure(f'resolve {count} services with parameters (first)', lambda: [provider.get(t) for t in types])
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    bench_register()
+    bench_memory()
+    bench_transients()
+    bench_scopes()
+    bench_threads()
+    bench_internal()
+
+if __name__ == '__main__':
+    main()
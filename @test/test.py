@@ -15,6 +15,35 @@ sys.path.insert(0, '..')
 
 import dependencyinjection as di
 
+# the process pool workers must be able to import them.
+class Unit:
+    pass
+
+class Worker:
+    def __init__(self, unit: Unit):
+        self.unit = unit
+
+def work(item, worker: Worker, scale=1):
+    return (item * scale, os.getpid(), id(worker.unit))
+
+class Table:
+    creates = 0
+
+    def __init__(self, values=None):
+        if values is None:
+            import array
+            values = array.array('q', range(1000))
+            Table.creates += 1
+        self.values = values
+
+    def __shm_dump__(self):
+        return self.values
+
+    @classmethod
+    def __shm_load__(cls, buffer):
+        return cls(buffer.cast('q'))
+
+
 class Test(unittest.TestCase):
     # pylint: disable=R0903,C0111
 
@@ -72,6 +101,36 @@ class Test(unittest.TestCase):
         with root_provider.scope() as child_provider:
             self.assertIs(child_provider.get(B).a, root_provider.get(A))
 
+    def test_check_lifetimes(self):
+        from dependencyinjection.internal.errors import CaptiveDependencyError, CaptiveDependencyWarning
+
+        class A:
+            pass
+
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        class C:
+            def __init__(self, b: B):
+                self.b = b
+
+        service = di.Services()
+        service.scoped(A)
+        service.transient(B)
+        service.singleton(C)
+        with self.assertRaises(CaptiveDependencyError):
+            service.check_lifetimes().build()
+        with self.assertWarns(CaptiveDependencyWarning):
+            service.check_lifetimes(strict=False).build()
+
+        service = di.Services()
+        service.singleton(A)
+        service.transient(B)
+        service.scoped(C)
+        provider = service.check_lifetimes().build()
+        self.assertIsInstance(provider.get(C), C)
+
     def test_scoped(self):
         tester = self
 
@@ -123,6 +182,826 @@ class Test(unittest.TestCase):
         self.assertFalse(provider.get(A) is provider.get(A))
         self.assertFalse(provider.get(B) is provider.get(B))
 
+    def test_weak(self):
+        import gc
+        import threading
+
+        class A:
+            pass
+
+        service = di.Services()
+        service.weak(A)
+        with self.assertRaises(ValueError):
+            service.weak(A, auto_exit=True)
+        class Slotted:
+            __slots__ = ()
+        with self.assertRaises(TypeError):
+            service.weak(Slotted)
+        class Schema:
+            pass
+        service.weak(Schema, lambda: {})
+        provider = service.threadsafety().build()
+        with self.assertRaisesRegex(TypeError, 'cannot be weakly referenced'):
+            provider.get(Schema)
+
+        a = provider.get(A)
+        with provider.scope() as scoped_provider:
+            self.assertIs(a, scoped_provider.get(A))
+        del a
+        gc.collect()
+        self.assertFalse(provider.weak_stats()[A]['alive'])
+
+        items = []
+        def resolve():
+            items.append(provider.get(A))
+        threads = [threading.Thread(target=resolve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(set(id(x) for x in items)))
+        self.assertEqual({'hits': 8, 'creates': 2, 'alive': True}, provider.weak_stats()[A])
+
+    def test_keyed(self):
+        class Tenant:
+            def __init__(self):
+                self.name = None
+
+        class Client:
+            def __init__(self, key):
+                self.name = key
+                self.exited = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.exited = True
+
+        service = di.Services()
+        service.scoped(Tenant)
+        service.keyed(Client, key=lambda provider: provider[Tenant].name, max_entries=2, auto_exit=True)
+        with self.assertRaises(ValueError):
+            service.keyed(Client, key=lambda provider: None, max_entries=0)
+
+        # the options which hold the user objects are not interned.
+        from dependencyinjection.internal import descriptors
+        count = len(descriptors._shared_options)
+        for _ in range(10):
+            di.Services().keyed(Client, key=lambda provider: None)
+        self.assertEqual(count, len(descriptors._shared_options))
+        self.assertIs(True, di.Services().keyed(Client, key=len, max_entries=True)._services[-1].options['max_entries'])
+        provider = service.build()
+
+        def get_client(name):
+            with provider.scope() as scoped_provider:
+                scoped_provider[Tenant].name = name
+                return scoped_provider[Client]
+
+        a = get_client('a')
+        self.assertEqual('a', a.name)
+        self.assertIs(a, get_client('a'))
+        b = get_client('b')
+        self.assertIsNot(a, b)
+        get_client('c') # evict a
+        self.assertTrue(a.exited)
+        self.assertFalse(b.exited)
+        self.assertIsNot(a, get_client('a')) # evict b
+        self.assertTrue(b.exited)
+        self.assertEqual({'size': 2, 'hits': 1, 'misses': 4, 'evictions': 2, 'expirations': 0},
+                         provider.keyed_stats()[Client])
+        provider.__exit__(None, None, None)
+        self.assertEqual(0, provider.keyed_stats()[Client]['size'])
+
+        # the instance is created from the root provider, so it cannot hold a scoped service.
+        class Session:
+            pass
+
+        class Connection:
+            def __init__(self, session: Session):
+                self.session = session
+
+        service = di.Services()
+        service.scoped(Tenant)
+        service.scoped(Session)
+        service.keyed(Connection, key=lambda provider: provider[Tenant].name)
+        from dependencyinjection.internal.errors import CaptiveDependencyError
+        with self.assertRaises(CaptiveDependencyError):
+            service.check_lifetimes().build()
+
+        # a singleton hold one instance of a keyed service forever.
+        class Pool:
+            def __init__(self, client: Client):
+                self.client = client
+
+        service = di.Services()
+        service.keyed(Client, key=lambda provider: 'a')
+        service.singleton(Pool)
+        with self.assertRaises(CaptiveDependencyError):
+            service.check_lifetimes().build()
+
+        # a slow key does not block the others.
+        import threading
+        import time
+
+        started = threading.Event()
+        class Slow:
+            def __init__(self, key):
+                if key == 'slow':
+                    started.set()
+                    time.sleep(0.5)
+
+        service = di.Services().threadsafety()
+        service.scoped(Tenant)
+        service.keyed(Slow, key=lambda provider: provider[Tenant].name)
+        provider = service.build()
+
+        def get_slow(name):
+            with provider.scope() as scoped_provider:
+                scoped_provider[Tenant].name = name
+                return scoped_provider[Slow]
+
+        thread = threading.Thread(target=get_slow, args=('slow', ), daemon=True)
+        thread.start()
+        self.assertTrue(started.wait(5))
+        begin = time.monotonic()
+        get_slow('fast')
+        self.assertLess(time.monotonic() - begin, 0.25)
+        thread.join(5)
+        self.assertEqual(2, provider.keyed_stats()[Slow]['size'])
+
+    def test_refreshable(self):
+        import time
+
+        versions = []
+
+        class Config:
+            def __init__(self):
+                if len(versions) == 2:
+                    versions.append(None)
+                    raise RuntimeError('source is unavailable')
+                self.version = len(versions)
+                self.exited = False
+                versions.append(self)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.exited = True
+
+        service = di.Services()
+        service.refreshable(Config, ttl=0.05, grace=0.05, retry=0.05, auto_exit=True)
+        provider = service.build()
+        first = provider.get(Config)
+        self.assertEqual(0, first.version)
+
+        deadline = time.monotonic() + 5
+        while len(versions) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        current = provider.get(Config)
+        self.assertGreaterEqual(current.version, 1)
+        stats = provider.refreshable_stats()[Config]
+        self.assertEqual(1, stats['failures'])
+        self.assertIsInstance(stats['last_error'], RuntimeError)
+
+        time.sleep(0.15)
+        self.assertTrue(first.exited)
+        provider.__exit__(None, None, None)
+        self.assertTrue(current.exited)
+
+        # the errors on exit the replaced instances does not stop the refresh thread.
+        class Feed:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                raise OSError('cannot close')
+
+        service = di.Services()
+        service.refreshable(Feed, ttl=0.02, auto_exit=True)
+        provider = service.build()
+        provider.get(Feed)
+        deadline = time.monotonic() + 5
+        while provider.refreshable_stats()[Feed]['refreshes'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = provider.refreshable_stats()[Feed]
+        self.assertGreaterEqual(stats['refreshes'], 3)
+        self.assertGreaterEqual(stats['failures'], 2)
+        self.assertIsInstance(stats['last_error'], OSError)
+        with self.assertRaises(OSError):
+            provider.__exit__(None, None, None)
+
+    def test_runtime_args(self):
+        class Db:
+            pass
+
+        class Handler:
+            def __init__(self, db: Db, request_id: str, retries=3):
+                self.db = db
+                self.request_id = request_id
+                self.retries = retries
+
+        class Dispatcher:
+            def __init__(self, factory: di.Factory[Handler]):
+                self.factory = factory
+
+        service = di.Services()
+        service.singleton(Db)
+        service.transient(Handler)
+        service.singleton(Dispatcher)
+        provider = service.build()
+
+        handler = provider.get(Handler, request_id='r1')
+        self.assertIs(provider.get(Db), handler.db)
+        self.assertEqual(('r1', 3), (handler.request_id, handler.retries))
+        self.assertEqual(1, len(provider._plans))
+        handler = provider.get(Dispatcher).factory(request_id='r2', retries=1)
+        self.assertEqual(('r2', 1), (handler.request_id, handler.retries))
+        self.assertIs(di.Factory[Handler], di.Factory[Handler])
+        self.assertEqual(2, len(provider._plans))
+        provider.get(Handler, request_id='r3')
+        self.assertEqual(2, len(provider._plans))
+        with self.assertRaises(TypeError):
+            provider.get(Handler, unknown=1)
+        with self.assertRaises(TypeError):
+            provider.get(Handler, request_id='r4', service_type=None)
+
+    def test_transient_bind_singletons(self):
+        class A:
+            pass
+
+        class B:
+            pass
+
+        class C:
+            def __init__(self, a: A, b: B, c=1):
+                self.a = a
+                self.b = b
+
+        service = di.Services()
+        service.singleton(A)
+        service.scoped(B)
+        service.transient(C)
+        provider = service.build()
+
+        with provider.scope() as scoped_provider:
+            c1 = scoped_provider.get(C)
+            c2 = scoped_provider.get(C)
+            self.assertIsNot(c1, c2)
+            self.assertIs(c1.a, c2.a)
+            self.assertIs(c2.b, scoped_provider.get(B))
+        self.assertEqual(1, len(provider._specialized))
+        with provider.scope() as scoped_provider:
+            self.assertIs(scoped_provider.get(C).b, scoped_provider.get(B))
+
+        a = provider.get(A)
+        provider.__exit__(None, None, None)
+        self.assertEqual(0, len(provider._specialized))
+        self.assertIsNot(a, provider.get(C).a)
+
+    def test_scope_pool(self):
+        class A:
+            def __init__(self):
+                self.exited = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.exited = True
+
+        service = di.Services()
+        service.scoped(A, auto_exit=True)
+        provider = service.scope_pool(max_size=1).track_scopes().build()
+
+        with provider.scope() as scoped_provider:
+            a = scoped_provider.get(A)
+            self.assertEqual(1, len(provider.live_scopes()))
+        self.assertTrue(a.exited)
+        self.assertEqual(0, len(provider.live_scopes()))
+        # the idle scope does not cache instances for the next owner.
+        with self.assertRaises(RuntimeError):
+            scoped_provider.get(A)
+        self.assertEqual(0, scoped_provider.stats().objects)
+
+        with provider.scope() as reused_provider:
+            self.assertIsNot(scoped_provider, reused_provider)
+            self.assertEqual(1, provider._scope_pool.reuses)
+            self.assertEqual(0, reused_provider.stats().objects)
+            self.assertIsNot(a, reused_provider.get(A))
+            self.assertEqual(1, len(provider.live_scopes()))
+            # the stale reference of the last owner is still exited.
+            with self.assertRaises(RuntimeError):
+                scoped_provider.get(A)
+            scoped_provider.__exit__(None, None, None)
+            self.assertFalse(reused_provider.get(A).exited)
+            with provider.scope() as other_provider:
+                self.assertIsNot(reused_provider, other_provider)
+        self.assertEqual(1, len(provider._scope_pool))
+        reused_provider.__exit__(None, None, None) # exit twice
+        self.assertEqual(1, len(provider._scope_pool))
+
+    def test_nested_scopes(self):
+        from dependencyinjection.internal.errors import ScopeLevelNotFoundError
+
+        class Request:
+            pass
+
+        class UnitOfWork:
+            def __init__(self, request: Request):
+                self.request = request
+                self.exited = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.exited = True
+
+        class Operation:
+            pass
+
+        service = di.Services()
+        service.scoped(Request, level='request')
+        service.scoped(UnitOfWork, level='uow', auto_exit=True)
+        service.scoped(Operation)
+        provider = service.build()
+
+        with provider.scope(level='request') as request_scope:
+            request = request_scope[Request]
+            uow_scope = request_scope.scope(level='uow')
+            uow = uow_scope[UnitOfWork]
+            self.assertIs(request, uow.request)
+            with uow_scope.scope() as op_scope:
+                self.assertIs(request, op_scope[Request])
+                self.assertIs(uow, op_scope[UnitOfWork])
+                self.assertIsNot(op_scope[Operation], uow_scope[Operation])
+            with request_scope.scope(level='uow') as other_scope:
+                self.assertIsNot(uow, other_scope[UnitOfWork])
+            with self.assertRaises(ScopeLevelNotFoundError):
+                request_scope[UnitOfWork]
+            # the uow scope is not exited by itself.
+            self.assertFalse(uow.exited)
+        self.assertTrue(uow.exited)
+
+        with self.assertRaises(ScopeLevelNotFoundError):
+            provider[Request]
+
+    def test_intercept(self):
+        class Repository:
+            def __init__(self, prefix=''):
+                self.prefix = prefix
+                self.loads = 0
+                self.exited = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.exited = True
+
+            @property
+            def name(self):
+                return 'repo'
+
+            def load(self, key):
+                self.loads += 1
+                return key * 2
+
+            def save(self, key):
+                return key
+
+        class Trace(di.Interceptor):
+            def __init__(self):
+                self.calls = []
+
+            def invoke(self, state, name, call, args, kwargs):
+                self.calls.append(name)
+                return call(*args, **kwargs)
+
+        trace = Trace()
+        service = di.Services()
+        service.scoped(Repository, auto_exit=True)
+        service.intercept(Repository, trace, di.Memoize('load', max_entries=8))
+        with self.assertRaises(TypeError):
+            service.intercept(Repository, object())
+        provider = service.build()
+
+        with provider.scope() as scoped_provider:
+            repo = scoped_provider[Repository]
+            self.assertIsInstance(repo, Repository)
+            self.assertIs(repo, scoped_provider[Repository])
+            self.assertEqual('repo', repo.name)
+            self.assertEqual(2, repo.load(1))
+            self.assertEqual(2, repo.load(1))
+            self.assertEqual(1, repo.loads)
+            self.assertEqual(3, repo.save(3))
+            self.assertEqual(['load', 'load', 'save'], trace.calls)
+        self.assertTrue(repo.exited)
+
+        with provider.scope() as scoped_provider:
+            # the cache live as long as the instance.
+            scoped_provider[Repository].load(1)
+            self.assertEqual(1, scoped_provider[Repository].loads)
+            # the instances which created with the runtime arguments are intercepted too.
+            repo = scoped_provider.get(Repository, prefix='p')
+            self.assertEqual(('p', 2, 2), (repo.prefix, repo.load(1), repo.load(1)))
+            self.assertEqual(1, repo.loads)
+
+        with self.assertRaises(ValueError):
+            di.Memoize()
+
+    def test_configure(self):
+        import dataclasses
+        import json
+        import tempfile
+
+        @dataclasses.dataclass
+        class PoolOptions:
+            size: int = 4
+
+        @dataclasses.dataclass
+        class DbOptions:
+            host: str
+            port: int = 5432
+            debug: bool = False
+            pool: PoolOptions = dataclasses.field(default_factory=PoolOptions)
+
+        @dataclasses.dataclass
+        class CacheOptions:
+            ttl: float
+
+        class Repository:
+            def __init__(self, options: DbOptions):
+                self.options = options
+
+        os.environ['DI_TEST_HOST'] = 'localhost'
+        os.environ['DI_TEST_DEBUG'] = 'yes'
+        os.environ['DI_TEST_POOL__SIZE'] = '8'
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                json_path = os.path.join(tmpdir, 'config.json')
+                with open(json_path, 'w') as fp:
+                    json.dump({'cache': {'ttl': 1.5}}, fp)
+                dotenv_path = os.path.join(tmpdir, '.env')
+                with open(dotenv_path, 'w') as fp:
+                    fp.write('# comment\nexport HOST="db.local"\nPORT=6543 # inline\n')
+
+                service = di.Services()
+                service.configure(DbOptions, source='env:DI_TEST_')
+                service.configure(CacheOptions, source=json_path, section='cache')
+                service.transient(Repository)
+                provider = service.build()
+
+                options = provider[DbOptions]
+                self.assertEqual(DbOptions('localhost', 5432, True, PoolOptions(8)), options)
+                self.assertIs(options, provider[Repository].options)
+                self.assertEqual(1.5, provider[CacheOptions].ttl)
+
+                monitor = provider[di.Options[DbOptions]]
+                changes = []
+                monitor.on_change(changes.append)
+                self.assertFalse(monitor.reload())
+                os.environ['DI_TEST_HOST'] = 'remote'
+                self.assertTrue(monitor.reload())
+                self.assertEqual(['remote'], [x.host for x in changes])
+                self.assertEqual('remote', provider[Repository].options.host)
+
+                provider = di.Services().configure(DbOptions, source=dotenv_path).build()
+                self.assertEqual(DbOptions('db.local', 6543), provider[DbOptions])
+        finally:
+            for name in ('DI_TEST_HOST', 'DI_TEST_DEBUG', 'DI_TEST_POOL__SIZE'):
+                del os.environ[name]
+
+        from dependencyinjection.internal.errors import ConfigurationError
+        provider = di.Services().configure(DbOptions, source={'port': 'x'}).build()
+        with self.assertRaises(ConfigurationError):
+            provider[DbOptions]
+
+    def test_build_twice(self):
+        class A:
+            pass
+
+        service = di.Services()
+        service.singleton(A)
+        count = len(service._services)
+        first, second = service.build(), service.build()
+        self.assertEqual(count, len(service._services))
+        self.assertIsNot(first[A], second[A])
+        self.assertIs(first._service_map, second._service_map)
+        service.bind('a', A)
+        self.assertIsNot(first._service_map, service.build()._service_map)
+
+    def test_override(self):
+        class Clock:
+            def now(self):
+                return 1
+
+        class FakeClock:
+            def now(self):
+                return 0
+
+        class Database:
+            pass
+
+        class Scheduler:
+            def __init__(self, clock: Clock, db: Database):
+                self.clock = clock
+                self.db = db
+
+        class Job:
+            def __init__(self, scheduler: Scheduler):
+                self.scheduler = scheduler
+
+        service = di.Services()
+        service.singleton(Clock)
+        service.singleton(Database)
+        service.singleton(Scheduler)
+        service.transient(Job)
+        provider = service.build()
+
+        db, scheduler = provider[Database], provider[Job].scheduler
+        fake = FakeClock()
+        with provider.override({Clock: fake}):
+            self.assertIs(fake, provider[Clock])
+            self.assertIs(fake, provider[Job].scheduler.clock)
+            self.assertIsNot(scheduler, provider[Scheduler])
+            # the unaffected singletons are reused.
+            self.assertIs(db, provider[Scheduler].db)
+            with provider.scope() as scoped_provider:
+                self.assertIs(fake, scoped_provider[Clock])
+        self.assertIs(scheduler, provider[Job].scheduler)
+        self.assertEqual(1, provider[Clock].now())
+
+        # override on a scope, the scoped services which already cached by it are recreated.
+        class Session:
+            def __init__(self, clock: Clock):
+                self.clock = clock
+                self.exited = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.exited = True
+
+        service.scoped(Session, auto_exit=True)
+        provider = service.build()
+        with provider.scope() as scoped_provider:
+            session = scoped_provider[Session]
+            with scoped_provider.override({Clock: fake}):
+                faked = scoped_provider[Session]
+                self.assertIs(fake, faked.clock)
+            self.assertTrue(faked.exited)
+            self.assertIs(session, scoped_provider[Session])
+            self.assertFalse(session.exited)
+        self.assertTrue(session.exited)
+
+    def test_concurrent_resolve(self):
+        import threading
+        import time
+
+        created = []
+        class Config:
+            def __init__(self):
+                created.append(self)
+
+        class Cache:
+            def __init__(self, config: Config):
+                self.config = config
+
+        class Session:
+            def __init__(self, cache: Cache):
+                self.cache = cache
+
+        class Handler:
+            def __init__(self, session: Session, config: Config):
+                self.session = session
+                self.config = config
+
+        class Shard:
+            pass
+
+        class Slow:
+            def __init__(self):
+                time.sleep(0.1) # hold the lock while the other thread start to create
+
+        class Index:
+            def __init__(self, shard: Shard):
+                self.shard = shard
+
+        class Search:
+            def __init__(self, slow: Slow, index: Index):
+                self.index = index
+
+        class Feed:
+            pass
+
+        class Rates:
+            def __init__(self, feed: Feed):
+                self.feed = feed
+
+        class Pricing:
+            def __init__(self, slow: Slow, rates: Rates):
+                self.rates = rates
+
+        service = di.Services().threadsafety()
+        service.singleton(Config)
+        service.singleton(Cache)
+        service.scoped(Session)
+        service.transient(Handler)
+        service.singleton(Shard)
+        service.singleton(Slow)
+        service.weak(Index)
+        service.singleton(Search)
+        service.singleton(Feed)
+        service.refreshable(Rates, ttl=60)
+        service.singleton(Pricing)
+        provider = service.build()
+
+        threads_count = 16
+        barrier = threading.Barrier(threads_count)
+        errors = []
+        results = []
+        def run(index):
+            try:
+                barrier.wait()
+                # resolve the long lived services from both sides of the dependencies at the same time.
+                first = ((Search, Pricing), (Index, Rates))[index % 2]
+                if index % 2:
+                    time.sleep(0.05)
+                for service_type in first:
+                    self.assertIsNotNone(provider[service_type])
+                for _ in range(200):
+                    with provider.scope() as scoped_provider:
+                        sessions = set()
+                        def resolve():
+                            sessions.add(id(scoped_provider[Handler].session))
+                        workers = [threading.Thread(target=resolve) for _ in range(2)]
+                        for worker in workers:
+                            worker.start()
+                        for worker in workers:
+                            worker.join()
+                        results.append((len(sessions), scoped_provider.get_callsite(Handler, None)))
+            except Exception as err: # pylint: disable=W0703
+                errors.append(err)
+        threads = [threading.Thread(target=run, args=(i, ), daemon=True) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+            self.assertFalse(thread.is_alive(), 'deadlock')
+        provider.__exit__(None, None, None)
+
+        self.assertEqual([], errors)
+        self.assertEqual(1, len(created))
+        # a scoped service is created once for each scope, even it is resolved by many threads.
+        self.assertEqual({1}, set(x[0] for x in results))
+        # all threads use the same published callsite.
+        self.assertEqual(1, len(set(id(x[1]) for x in results)))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork()')
+    def test_shared(self):
+        from multiprocessing import shared_memory
+
+        service = di.Services()
+        service.shared(Table)
+        with self.assertRaises(TypeError):
+            service.shared(Worker)
+        first, second = service.build(), service.build()
+
+        self.assertEqual(999, first[Table].values[999])
+        self.assertEqual(999, second[Table].values[999])
+        self.assertEqual(1, Table.creates)
+        stats = first.shared_stats()[Table]
+        self.assertEqual((8000, 2), (stats['size'], stats['refcount']))
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            result = second[Table].values[10] == 10
+            # the child process attach to the segments too.
+            first.__exit__(None, None, None)
+            second.__exit__(None, None, None)
+            os.write(write_fd, bytes([int(result)]))
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        self.assertEqual(b'\x01', os.read(read_fd, 1))
+        os.close(read_fd)
+        self.assertEqual(2, first.shared_stats()[Table]['refcount'])
+
+        # the references of a process which exit without release are dropped.
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if second.shared_stats()[Table]['refcount'] == 4 else 1)
+        self.assertEqual(0, os.waitpid(pid, 0)[1])
+        self.assertEqual(2, first.shared_stats()[Table]['refcount'])
+
+        first.__exit__(None, None, None)
+        self.assertEqual(1, second.shared_stats()[Table]['refcount'])
+        name = second.shared_stats()[Table]['name']
+        second.__exit__(None, None, None)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_transient_auto_exit(self):
+        import warnings
+        from dependencyinjection.internal.errors import DisposableLimitError, DisposableLimitWarning
+
+        exited = []
+        class Connection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                exited.append(self)
+
+        class Plain:
+            pass
+
+        service = di.Services()
+        service.transient(Connection, auto_exit=True)
+        service.transient(Plain)
+        provider = service.max_transient_disposables(3).build()
+
+        with provider.scope() as scoped_provider:
+            conns = [scoped_provider[Connection] for _ in range(2)]
+            scoped_provider[Plain]
+            self.assertEqual(2, scoped_provider.stats().transient_exit_count)
+            self.assertEqual([], exited)
+        self.assertEqual(list(reversed(conns)), exited)
+
+        with provider.scope() as scoped_provider:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                for _ in range(5):
+                    scoped_provider[Connection]
+            self.assertEqual([DisposableLimitWarning], [x.category for x in caught])
+
+        provider = service.max_transient_disposables(1, strict=True).build()
+        with provider.scope() as scoped_provider:
+            scoped_provider[Connection]
+            with self.assertRaises(DisposableLimitError):
+                scoped_provider[Connection]
+            self.assertEqual(1, scoped_provider.stats().transient_exit_count)
+
+        # the instances which created with the runtime arguments are limited too.
+        class Channel(Connection):
+            def __init__(self, name):
+                self.name = name
+
+        service.transient(Channel, auto_exit=True)
+        provider = service.max_transient_disposables(1, strict=True).build()
+        with provider.scope() as scoped_provider:
+            scoped_provider.get(Channel, name='a')
+            with self.assertRaises(DisposableLimitError):
+                scoped_provider.get(Channel, name='b')
+            self.assertEqual(1, scoped_provider.stats().transient_exit_count)
+
+    def test_invoke(self):
+        service = di.Services()
+        service.singleton(Worker)
+        service.scoped(Unit)
+        provider = service.build()
+
+        self.assertEqual(6, provider.invoke(work, 3, scale=2)[0])
+        self.assertEqual(3, provider.invoke(work, item=3)[0])
+        self.assertEqual(id(provider[Unit]), provider.invoke(work, 1)[2])
+        with self.assertRaises(TypeError):
+            provider.invoke(work, 1, 2, 3, 4)
+        with self.assertRaises(TypeError):
+            provider.invoke(work, 1, unknown=2)
+
+        # the plans of the closures are bounded.
+        from dependencyinjection.internal.provider import MAX_INVOKE_PLANS
+        for i in range(MAX_INVOKE_PLANS * 2):
+            self.assertEqual(i, provider.invoke(lambda worker: i, worker=None))
+        self.assertEqual(MAX_INVOKE_PLANS, len(provider._invoke_plans))
+
+    def test_executor(self):
+        service = di.Services()
+        service.transient(Worker)
+        service.scoped(Unit)
+        provider = service.build()
+
+        results = provider.map(work, range(6), max_workers=2, chunksize=3)
+        self.assertEqual([0, 1, 2, 3, 4, 5], [x[0] for x in results])
+        # the items in a chunk share a scope.
+        self.assertEqual(1, len(set(x[2] for x in results[:3])))
+
+        with provider.executor(max_workers=2) as executor:
+            self.assertEqual(4, executor.submit(work, 2, scale=2).result()[0])
+        with self.assertRaises(ValueError):
+            provider.executor(kind='fiber')
+
+        import pickle
+        self.assertIsNotNone(pickle.loads(pickle.dumps(provider.services)).build())
+        results = provider.map(work, range(4), max_workers=2, kind='process')
+        self.assertEqual([0, 1, 2, 3], [x[0] for x in results])
+        self.assertNotIn(os.getpid(), set(x[1] for x in results))
+
     def test_context(self):
         tester = self
         class A:
@@ -155,6 +1034,327 @@ class Test(unittest.TestCase):
             self.assertTrue(b1.exited)
         self.assertTrue(broot.exited)
 
+    def test_scope_stats(self):
+        class A:
+            pass
+
+        class B:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+        service = di.Services()
+        service.scoped(A)
+        service.scoped(B, auto_exit=True)
+        provider = service.track_scopes().build()
+
+        with provider.scope() as scoped_provider:
+            scoped_provider.get(A)
+            scoped_provider.get(B)
+            stats = scoped_provider.stats(with_size=True)
+            self.assertEqual(2, stats.objects)
+            self.assertEqual(1, stats.exit_count)
+            self.assertEqual({'A': 1, 'B': 1}, {k.rsplit('.', 1)[-1]: v for k, v in stats.contents.items()})
+            self.assertGreater(stats.size, 0)
+            self.assertEqual(1, len(provider.live_scopes()))
+        self.assertEqual(0, len(provider.live_scopes()))
+
+    def test_scope_leak_warning(self):
+        import gc
+        from dependencyinjection.internal.errors import ScopeLeakWarning
+
+        provider = di.Services().track_scopes().build()
+        scoped_provider = provider.scope()
+        self.assertEqual(1, len(provider.live_scopes()))
+        with self.assertWarns(ScopeLeakWarning):
+            del scoped_provider
+            gc.collect()
+        self.assertEqual(0, len(provider.live_scopes()))
+
+    def test_shutdown(self):
+        import threading
+        import time
+
+        events = []
+        release = threading.Event()
+
+        class Resource:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                events.append(type(self).__name__)
+
+        class A(Resource):
+            pass
+
+        class B(Resource):
+            def __init__(self, a: A):
+                pass
+
+        class C(Resource):
+            def __init__(self, b: B):
+                pass
+
+        class D(Resource):
+            pass
+
+        class Stuck(Resource):
+            def __exit__(self, *args):
+                release.wait(5)
+
+        class Broken(Resource):
+            def __exit__(self, *args):
+                raise ValueError
+
+        service = di.Services()
+        for cls in (A, B, C, D, Stuck, Broken):
+            service.singleton(cls, auto_exit=True)
+        provider = service.build()
+        for cls in (A, B, C, D, Stuck, Broken):
+            provider.get(cls)
+
+        begin = time.monotonic()
+        report = provider.shutdown(timeout=0.2)
+        release.set()
+        self.assertLess(time.monotonic() - begin, 2)
+        self.assertFalse(report.ok)
+        self.assertEqual(['Stuck'], [type(x).__name__ for x in report.timed_out])
+        self.assertEqual(['Broken'], [type(x).__name__ for x, _ in report.failed])
+        self.assertEqual(4, len(report.disposed))
+        # reverse dependency order.
+        self.assertLess(events.index('C'), events.index('B'))
+        self.assertLess(events.index('B'), events.index('A'))
+        self.assertEqual(0, provider.stats().objects)
+
+        # the errors of the keyed and refreshable instances are collected too.
+        class Pool(Resource):
+            pass
+
+        class Feed(Resource):
+            def __init__(self, pool: Pool):
+                pass
+
+            def __exit__(self, *args):
+                events.append('Feed')
+                raise OSError
+
+        class Stream(Feed):
+            pass
+
+        def build():
+            events.clear()
+            service = di.Services()
+            service.singleton(Pool, auto_exit=True)
+            service.keyed(Feed, key=lambda provider: 'k', auto_exit=True)
+            service.refreshable(Stream, ttl=60, auto_exit=True)
+            provider = service.build()
+            provider.get(Feed)
+            provider.get(Stream)
+            return provider
+
+        report = build().shutdown()
+        self.assertEqual({'Feed', 'Stream'}, set(type(x).__name__ for x, _ in report.failed))
+        self.assertEqual(['Pool'], [type(x).__name__ for x in report.disposed])
+        self.assertEqual(['Feed', 'Feed', 'Pool'], events)
+
+        provider = build()
+        with self.assertRaises(OSError):
+            provider.__exit__(None, None, None)
+        self.assertEqual(['Feed', 'Feed', 'Pool'], events)
+        self.assertEqual(0, provider.stats().objects)
+
+    def test_graph(self):
+        import json
+        import time
+
+        class A:
+            def __init__(self):
+                time.sleep(0.01)
+
+        class B:
+            pass
+
+        class C:
+            def __init__(self, a: A, b: B):
+                pass
+
+        class D:
+            def __init__(self, c: C, b: B):
+                pass
+
+        service = di.Services()
+        service.singleton(A)
+        service.scoped(B)
+        service.transient(C)
+        service.transient(D)
+        provider = service.profile().build()
+        provider.get(D)
+
+        graph = provider.graph()
+        self.assertEqual(3, graph.fan_out(D))
+        cost, path = graph.critical_path(D)
+        self.assertEqual(['D', 'C', 'A'], [x.name.rsplit('.', 1)[-1] for x in path])
+        self.assertGreaterEqual(cost, 0.01)
+        self.assertEqual('singleton', graph.node(A).lifetime.name)
+
+        data = json.loads(graph.to_json())
+        self.assertEqual(graph.node(D).id, data['roots'][D.__qualname__])
+        self.assertIn(f'{graph.node(D).id} -> {graph.node(C).id};', graph.to_dot())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork()')
+    def test_fork_policy(self):
+        class Table:
+            pass
+
+        class Connection:
+            pass
+
+        class Repository:
+            def __init__(self, conn: Connection):
+                self.conn = conn
+
+        service = di.Services().threadsafety()
+        service.singleton(Table)
+        service.singleton(Connection, fork='recreate_after_fork')
+        service.singleton(Repository)
+        with self.assertRaises(ValueError):
+            service.singleton(Table, fork='unknown')
+        provider = service.build()
+
+        self.assertEqual(1, provider.warmup())
+        table, conn, repo = provider.get(Table), provider.get(Connection), provider.get(Repository)
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            with provider._lock:
+                result = (provider.get(Table) is table,
+                          provider.get(Connection) is not conn,
+                          provider.get(Repository) is not repo)
+            os.write(write_fd, bytes(int(x) for x in result))
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        self.assertEqual(b'\x01\x01\x01', os.read(read_fd, 3))
+        os.close(read_fd)
+        self.assertIs(provider.get(Connection), conn)
+
+    def test_lazy_registration(self):
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'di_lazy_mod.py'), 'w') as fp:
+                fp.write('class Service:\n    pass\n')
+                fp.write('class Impl(Service):\n    pass\n')
+            sys.path.insert(0, tmpdir)
+            try:
+                service = di.Services()
+                service.singleton('di_lazy_mod:Service', 'di_lazy_mod:Impl')
+                with self.assertRaises(ValueError):
+                    service.singleton('di_lazy_mod.Service')
+                provider = service.build()
+                self.assertNotIn('di_lazy_mod', sys.modules)
+                report, = provider.import_report()
+                self.assertEqual('di_lazy_mod:Impl', report['path'])
+                self.assertFalse(report['imported'])
+
+                import di_lazy_mod
+                obj = provider.get(di_lazy_mod.Service)
+                self.assertIsInstance(obj, di_lazy_mod.Impl)
+                self.assertIs(obj, provider.get('di_lazy_mod:Service'))
+                report, = provider.import_report()
+                self.assertTrue(report['imported'])
+                self.assertIsNotNone(report['seconds'])
+            finally:
+                sys.path.remove(tmpdir)
+                sys.modules.pop('di_lazy_mod', None)
+
+        # the types which has the same path are not merged with a import path registration.
+        def make():
+            class Repository:
+                pass
+            return Repository
+
+        R1, R2 = make(), make()
+        service = di.Services()
+        service.transient(R1)
+        service.transient(R2)
+        service.transient('json:JSONDecoder')
+        provider = service.build()
+        self.assertIs(R1, type(provider[R1]))
+        self.assertIs(R2, type(provider[R2]))
+
+    def test_add_many(self):
+        class A:
+            pass
+
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        service = di.Services()
+        service.add_many([
+            (A, None, 'singleton'),
+            (B, B, di.internal.common.LifeTime.transient, {'auto_exit': False}),
+        ])
+        with self.assertRaises(ValueError):
+            service.add_many([(A, None, 'unknown')])
+        # the required options are validated as the helpers.
+        with self.assertRaises(ValueError):
+            service.add_many([(A, None, 'refreshable')])
+        if hasattr(os, 'fork'):
+            with self.assertRaises(TypeError):
+                service.add_many([(A, None, 'shared')])
+            service.add_many([(Table, None, 'shared')])
+            self.assertTrue(service._services.pop().options['name'])
+        else:
+            with self.assertRaises(NotImplementedError):
+                service.add_many([(Table, None, 'shared')])
+        provider = service.build()
+        self.assertIs(provider.get(B).a, provider.get(A))
+        self.assertIsNot(provider.get(B), provider.get(B))
+
+    def test_scan(self):
+        import tempfile
+        import textwrap
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pkg = os.path.join(tmpdir, 'di_scan_pkg')
+            os.mkdir(pkg)
+            with open(os.path.join(pkg, '__init__.py'), 'w') as fp:
+                fp.write('')
+            with open(os.path.join(pkg, 'mod.py'), 'w') as fp:
+                fp.write(textwrap.dedent('''
+                    import dependencyinjection as di
+
+                    @di.injectable('singleton')
+                    class A:
+                        pass
+
+                    class B(A):
+                        pass
+
+                    @di.injectable(service_type=A)
+                    def create_b():
+                        return B()
+                '''))
+            sys.path.insert(0, tmpdir)
+            try:
+                provider = di.Services().scan('di_scan_pkg').build()
+                from di_scan_pkg import mod
+                # the last registered one is the transient factory.
+                self.assertIsInstance(provider.get(mod.A), mod.B)
+                self.assertIsNot(provider.get(mod.A), provider.get(mod.A))
+                # the marker is not inherited.
+                self.assertIsNone(provider._service_map.get(mod.B))
+            finally:
+                sys.path.remove(tmpdir)
+                for name in ('di_scan_pkg', 'di_scan_pkg.mod'):
+                    sys.modules.pop(name, None)
+
     def test_multi_service(self):
         tester = self
         class A:
@@ -265,6 +1465,8 @@ class Test(unittest.TestCase):
 
         provider = di.Services().auto_resolve_concrete_types().build()
         self.assertIsInstance(provider.get(A), A)
+        # the unregistered import paths are not resolved.
+        self.assertIsNone(provider.get('os:PathLike'))
 
     def test_auto_resolving_concrete_types_complex(self):
         class X1:
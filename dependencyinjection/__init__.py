@@ -8,9 +8,18 @@
 
 from .internal.common import IServiceProvider
 from .internal.services import Services
+from .internal.scanner import injectable
+from .internal.factory import Factory
+from .internal.intercept import Interceptor, Memoize
+from .internal.options import Options
 
 
 __all__ = [
     'Services',
-    'IServiceProvider'
+    'IServiceProvider',
+    'injectable',
+    'Factory',
+    'Interceptor',
+    'Memoize',
+    'Options'
 ]
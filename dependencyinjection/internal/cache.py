@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import collections
+import contextlib
+import threading
+import time
+import typing
+
+from .lock import ThreadLock
+
+MISSING = object()
+
+
+class LRUCache:
+    '''
+    a thread safety LRU cache which bounded by `max_entries` and/or `ttl` (seconds).
+
+    `on_evict(key, value)` is called after a entry was evicted, expired or cleared.
+    '''
+
+    def __init__(self, max_entries: int=None, ttl: float=None, on_evict: typing.Callable=None):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError('max_entries must be greater than 0')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be greater than 0')
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._on_evict = on_evict
+        self._lock = ThreadLock()
+        self._entries = collections.OrderedDict() # key to (value, expires_at)
+        self._key_locks: typing.Dict[object, list] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None, *, record=True):
+        ''' get the value of `key`, count the hits and the misses if `record` is `True`. '''
+        expired = MISSING
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    if record:
+                        self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+                expired = value
+            if record:
+                self.misses += 1
+        if expired is not MISSING:
+            self._evicted(key, expired)
+        return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self._ttl if self._ttl is not None else None
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None and old[0] is not value:
+                evicted.append((key, old[0]))
+            self._entries[key] = (value, expires_at)
+            if self._max_entries is not None:
+                while len(self._entries) > self._max_entries:
+                    evicted.append(self._pop_oldest())
+                    self.evictions += 1
+        for item in evicted:
+            self._evicted(*item)
+
+    def _pop_oldest(self):
+        key, (value, _) = self._entries.popitem(last=False)
+        return key, value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self, evict=True) -> list:
+        ''' remove all entries, call `on_evict` for them if `evict` is `True`; returns the values from the oldest. '''
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        if evict:
+            for key, (value, _) in reversed(entries):
+                self._evicted(key, value)
+        return [value for _, (value, _) in entries]
+
+    def _evicted(self, key, value):
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+    @contextlib.contextmanager
+    def lock_key(self, key):
+        ''' a lock for create the value of `key`, so the other keys are not blocked. '''
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
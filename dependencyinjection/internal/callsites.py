@@ -6,14 +6,26 @@
 # ----------
 
 from abc import abstractmethod
+import functools
+import inspect
+import time
+import types
 import typing
 
-from .common import IDescriptor, LifeTime
+from .common import IDescriptor, LifeTime, KEY_PARAMETER
+from .cache import MISSING
+from .errors import ScopeLevelNotFoundError
+from .intercept import make_proxy
+
+# shared by the callsites which has no options or no parameters.
+EMPTY_MAPPING = types.MappingProxyType({})
 
 class BaseCallSite:
+    __slots__ = ('_descriptor', '_options')
+
     def __init__(self, descriptor, options: dict=None):
         self._descriptor = descriptor
-        self._options = options if options is not None else {}
+        self._options = options if options is not None else EMPTY_MAPPING
 
     @property
     def descriptor(self):
@@ -27,22 +39,37 @@ class BaseCallSite:
     def options(self):
         return self._options
 
+    @property
+    def dependencies(self) -> typing.Tuple['BaseCallSite', ...]:
+        ''' the callsites which this callsite resolve from. '''
+        return ()
+
 
 class LifeTimeCallSite(BaseCallSite):
+    __slots__ = ('_base_callsite', )
+
     def __init__(self, descriptor, base_callsite: BaseCallSite):
         super().__init__(descriptor)
-        self._descriptor = descriptor
         self._base_callsite = base_callsite
 
+    @property
+    def dependencies(self):
+        return (self._base_callsite, )
+
     def _from_provider(self, provider):
         descriptor = self._descriptor
+        # the instance is published after it was created, so readers does not need the lock.
+        obj = provider._cache_list.get(descriptor, MISSING)
+        if obj is not MISSING:
+            return obj
         with provider._lock:
-            if descriptor not in provider._cache_list:
+            obj = provider._cache_list.get(descriptor, MISSING)
+            if obj is MISSING:
                 obj = self._from_callsite(provider)
                 if self._base_callsite.options.get('auto_exit'):
-                    provider._exit_stack.enter_context(obj)
+                    provider.enter_context(obj, descriptor)
                 provider._cache_list[descriptor] = obj
-            return provider._cache_list[descriptor]
+            return obj
 
     def _from_callsite(self, provider):
         return self._base_callsite.get(provider)
@@ -58,25 +85,178 @@ class LifeTimeCallSite(BaseCallSite):
         if descriptor.lifetime is LifeTime.scoped:
             return ScopedCallSite(descriptor, callsite)
 
+        if descriptor.lifetime is LifeTime.weak:
+            return WeakCallSite(descriptor, callsite)
+
+        if descriptor.lifetime is LifeTime.keyed:
+            return KeyedCallSite(descriptor, callsite)
+
+        if descriptor.lifetime is LifeTime.refreshable:
+            return RefreshableCallSite(descriptor, callsite)
+
+        if descriptor.lifetime is LifeTime.shared:
+            return SharedCallSite(descriptor, callsite)
+
+        if descriptor.lifetime is LifeTime.transient and callsite.options.get('auto_exit'):
+            return DisposableTransientCallSite(descriptor, callsite)
+
         return callsite
 
 
 class SingletonCallSite(LifeTimeCallSite):
+    __slots__ = ()
+
     def get(self, service_provider):
         return self._from_provider(service_provider.root_provider)
 
 
 class ScopedCallSite(LifeTimeCallSite):
+    '''
+    cache the instance on the resolving scope,
+    or on the nearest scope of the `level` option which found from `ServiceProvider._levels`.
+    '''
+    __slots__ = ('_level', )
+
+    def __init__(self, descriptor, base_callsite: BaseCallSite):
+        super().__init__(descriptor, base_callsite)
+        self._level = descriptor.options.get('level')
+
     def get(self, service_provider):
+        level = self._level
+        if level is not None:
+            owner = service_provider._levels.get(level)
+            if owner is None:
+                raise ScopeLevelNotFoundError(
+                    f'cannot resolve {self._descriptor.service_type} out of a scope of level {level!r}')
+            return self._from_provider(owner)
         return self._from_provider(service_provider)
 
 
+class WeakCallSite(LifeTimeCallSite):
+    '''
+    share the instance while it is alive, create a new one after it was collected.
+    the instances are cached by the root provider and hold by weak reference.
+    '''
+    __slots__ = ('hits', 'creates')
+
+    def __init__(self, descriptor, base_callsite: BaseCallSite):
+        super().__init__(descriptor, base_callsite)
+        self.hits = 0
+        self.creates = 0
+
+    def get(self, service_provider):
+        root = service_provider.root_provider
+        descriptor = self._descriptor
+        obj = root._weak_cache.get(descriptor)
+        if obj is None:
+            # create under the lock of the root provider like singletons, so the locks has one order.
+            with root._lock:
+                obj = root._weak_cache.get(descriptor)
+                if obj is None:
+                    obj = self._from_callsite(root)
+                    try:
+                        root._weak_cache[descriptor] = obj
+                    except TypeError:
+                        raise TypeError(f'{type(obj)} cannot be weakly referenced, '
+                                        f'the weak service {descriptor.service_type} must return a object '
+                                        'which support weak reference (like the `__weakref__` slot).') from None
+                    self.creates += 1
+                    return obj
+        self.hits += 1
+        return obj
+
+
+class KeyedCallSite(LifeTimeCallSite):
+    '''
+    a singleton per key which returned by the `key` option,
+    the instances are cached by a bounded LRU cache of the root provider.
+
+    the key is computed from the requesting provider, but the instance is created from the root provider,
+    so it never hold a scoped service of the scope which it was requested from.
+    '''
+    __slots__ = ('_pass_key', )
+
+    def __init__(self, descriptor, base_callsite: BaseCallSite):
+        super().__init__(descriptor, base_callsite)
+        # the factory which has a `key` parameter receive the key.
+        self._pass_key = KEY_PARAMETER in getattr(base_callsite, 'runtime_parameters', ())
+
+    def get(self, service_provider):
+        root = service_provider.root_provider
+        cache = root._get_keyed_cache(self._descriptor)
+        key = self._descriptor.options['key'](service_provider)
+        obj = cache.get(key, MISSING)
+        if obj is MISSING:
+            # only lock the key, so a slow key does not block the others;
+            # a singleton which depend on it is a captive dependency, see `LifeTimeChecker`.
+            with cache.lock_key(key):
+                obj = cache.get(key, MISSING, record=False)
+                if obj is MISSING:
+                    if self._pass_key:
+                        obj = self._base_callsite.invoke(root, {KEY_PARAMETER: key})
+                    else:
+                        obj = self._from_callsite(root)
+                    if self._base_callsite.options.get('auto_exit'):
+                        # exit on evicted, see `ServiceProvider._get_keyed_cache()`.
+                        type(obj).__enter__(obj)
+                    cache.set(key, obj)
+        return obj
+
+
+class RefreshableCallSite(LifeTimeCallSite):
+    '''
+    a singleton which recreated in background after the `ttl`,
+    the readers always get the current instance without blocking.
+    '''
+    __slots__ = ()
+
+    def get(self, service_provider):
+        root = service_provider.root_provider
+        refresher = root._refreshers.get(self._descriptor)
+        if refresher is None:
+            with root._lock:
+                refresher = root._refreshers.get(self._descriptor)
+                if refresher is None:
+                    refresher = root._start_refresher(self._descriptor, self._base_callsite)
+        return refresher.current
+
+
+class SharedCallSite(LifeTimeCallSite):
+    '''
+    a singleton which stored in a shared memory segment,
+    the first process create it and the other processes attach to the same memory.
+    '''
+    __slots__ = ()
+
+    def get(self, service_provider):
+        root = service_provider.root_provider
+        obj = root._cache_list.get(self._descriptor, MISSING)
+        if obj is MISSING:
+            with root._lock:
+                obj = root._cache_list.get(self._descriptor, MISSING)
+                if obj is MISSING:
+                    obj = root._attach_shared(self._descriptor, lambda: self._from_callsite(root))
+        return obj
+
+
+class DisposableTransientCallSite(LifeTimeCallSite):
+    ''' a transient which exited by the resolving provider, the other transients are not wrapped. '''
+    __slots__ = ()
+
+    def get(self, service_provider):
+        obj = self._from_callsite(service_provider)
+        service_provider._enter_transient(obj, self._descriptor)
+        return obj
+
+
 class NoLifeTimeCallSite(BaseCallSite):
     ''' the callsite does not need to wraped into `LifeTimeCallSite`.'''
-    pass
+    __slots__ = ()
 
 
 class InstanceCallSite(NoLifeTimeCallSite):
+    __slots__ = ('_instance', )
+
     def __init__(self, descriptor, instance):
         super().__init__(descriptor)
         self._instance = instance
@@ -86,15 +266,35 @@ class InstanceCallSite(NoLifeTimeCallSite):
 
 
 class ServiceProviderCallSite(NoLifeTimeCallSite):
+    __slots__ = ()
+
     def get(self, service_provider):
         return service_provider
 
 
+class FactoryCallSite(NoLifeTimeCallSite):
+    ''' create `Factory[T]` which bound to the resolving provider. '''
+    __slots__ = ('_factory_type', )
+
+    def __init__(self, factory_type: type):
+        super().__init__(None)
+        self._factory_type = factory_type
+
+    def get(self, service_provider):
+        return self._factory_type(service_provider)
+
+
 class ListedCallSite(NoLifeTimeCallSite):
+    __slots__ = ('_callsites', )
+
     def __init__(self, callsites: typing.List[BaseCallSite]):
         super().__init__(None)
         self._callsites = callsites
 
+    @property
+    def dependencies(self):
+        return tuple(self._callsites)
+
     def get(self, service_provider):
         items = []
         for callsite in self._callsites:
@@ -102,17 +302,119 @@ class ListedCallSite(NoLifeTimeCallSite):
         return items
 
 
+class InterceptedCallSite(BaseCallSite):
+    ''' wrap the instances which created by the base callsite with the interceptors proxy. '''
+    __slots__ = ('_base_callsite', '_interceptors')
+
+    def __init__(self, descriptor, base_callsite: BaseCallSite, interceptors: tuple):
+        super().__init__(descriptor, base_callsite.options)
+        self._base_callsite = base_callsite
+        self._interceptors = interceptors
+
+    @property
+    def dependencies(self):
+        # transparent for the graph and the checkers.
+        return self._base_callsite.dependencies
+
+    def get(self, service_provider):
+        return make_proxy(self._base_callsite.get(service_provider), self._interceptors)
+
+    def invoke(self, service_provider, runtime_args: dict):
+        return make_proxy(self._base_callsite.invoke(service_provider, runtime_args), self._interceptors)
+
+    @property
+    def runtime_parameters(self):
+        return self._base_callsite.runtime_parameters
+
+
 class CallableCallSite(BaseCallSite):
+    __slots__ = ('_func', '_param_callsites', '_bound', '_bound_callsites')
+
     def __init__(self, descriptor, func, param_callsites: typing.Dict[str, BaseCallSite], options: dict):
         super().__init__(descriptor, options)
         self._func = func
         self._param_callsites = param_callsites
+        # `func` with the singleton arguments, and the callsites of the other parameters.
+        self._bound = None
+        self._bound_callsites = None
+
+    @property
+    def dependencies(self):
+        return tuple(self._param_callsites.values())
 
     def get(self, service_provider):
+        bound = self._bound
+        if bound is not None:
+            if self._bound_callsites:
+                kwargs = {}
+                for name, callsite in self._bound_callsites:
+                    kwargs[name] = callsite.get(service_provider)
+                return bound(**kwargs)
+            return bound()
+
         if self._param_callsites:
             kwargs = {}
             for name, callsite in self._param_callsites.items():
                 kwargs[name] = callsite.get(service_provider)
-            return self._func(**kwargs)
+            obj = self._func(**kwargs)
+            if self._bound_callsites is None:
+                # the singleton arguments are created now.
+                self._specialize(service_provider.root_provider)
+            return obj
         else:
             return self._func()
+
+    def _specialize(self, root_provider):
+        ''' bind the arguments which never change into `func`, resolve the other parameters only. '''
+        static = {}
+        dynamic = []
+        for name, callsite in self._param_callsites.items():
+            if type(callsite) in _BINDABLE_CALLSITES:
+                static[name] = callsite.get(root_provider)
+            else:
+                dynamic.append((name, callsite))
+        # publish `_bound_callsites` before `_bound`, `get()` read them in reversed order.
+        self._bound_callsites = tuple(dynamic)
+        if static:
+            self._bound = functools.partial(self._func, **static)
+            root_provider._specialized.append(self)
+
+    def reset_specialization(self):
+        self._bound = None
+        self._bound_callsites = None
+
+    @property
+    def runtime_parameters(self) -> typing.FrozenSet[str]:
+        ''' the parameters which are not resolved, they should be passed by `invoke()`. '''
+        return frozenset(inspect.signature(self._func).parameters) - frozenset(self._param_callsites)
+
+    def invoke(self, service_provider, runtime_args: dict):
+        ''' call the factory with the resolved parameters and the `runtime_args`. '''
+        kwargs = {}
+        for name, callsite in self._param_callsites.items():
+            kwargs[name] = callsite.get(service_provider)
+        kwargs.update(runtime_args)
+        return self._func(**kwargs)
+
+
+_BINDABLE_CALLSITES = (SingletonCallSite, InstanceCallSite)
+
+
+class ProfiledCallableCallSite(CallableCallSite):
+    ''' record the cost of `func` itself, exclude the cost of resolve the parameters. '''
+    __slots__ = ('calls', 'total_time')
+
+    def __init__(self, descriptor, func, param_callsites: typing.Dict[str, BaseCallSite], options: dict):
+        super().__init__(descriptor, func, param_callsites, options)
+        self.calls = 0
+        self.total_time = 0.0
+
+    def get(self, service_provider):
+        kwargs = {}
+        for name, callsite in self._param_callsites.items():
+            kwargs[name] = callsite.get(service_provider)
+        begin = time.perf_counter()
+        obj = self._func(**kwargs)
+        self.total_time += time.perf_counter() - begin
+        self.calls += 1
+        return obj
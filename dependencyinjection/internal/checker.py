@@ -6,7 +6,12 @@
 #
 # ----------
 
-from .errors import CycleDependencyError
+import typing
+import warnings
+
+from .common import LifeTime
+from .errors import CycleDependencyError, CaptiveDependencyError, CaptiveDependencyWarning
+from .callsites import BaseCallSite, LifeTimeCallSite
 
 
 class CycleChecker:
@@ -23,10 +28,87 @@ class CycleChecker:
     def add_or_raise(self, service_type: type):
         self._chain.append(service_type)
         if service_type in self._chain_set:
-            msg = ' -> '.join([str(x.__name__) for x in self._chain])
+            msg = ' -> '.join([str(getattr(x, '__name__', x)) for x in self._chain])
             raise CycleDependencyError(msg)
         self._chain_set.add(service_type)
         return self
 
     def remove_last(self):
         self._chain_set.remove(self._chain.pop())
+
+
+def _name_of(callsite: BaseCallSite):
+    descriptor = callsite.descriptor
+    service_type = getattr(descriptor, 'service_type', None)
+    if service_type is None:
+        return type(callsite).__name__
+    return getattr(service_type, '__name__', str(service_type))
+
+
+def _distinct_descriptors(chain: typing.List[BaseCallSite]):
+    last = None
+    for callsite in chain:
+        if callsite.descriptor is not None and callsite.descriptor is not last:
+            last = callsite.descriptor
+            yield callsite
+
+
+class LifeTimeChecker:
+    '''
+    detect captive dependencies from the callsite graph:
+    a long lived service which hold a short lived service forever.
+    '''
+
+    # lifetimes which cache instance longer than a scope.
+    LONG_LIVED = set([LifeTime.singleton, LifeTime.weak, LifeTime.keyed, LifeTime.refreshable, LifeTime.shared])
+    # lifetimes which cache instance for a scope.
+    SHORT_LIVED = set([LifeTime.scoped])
+    # lifetimes which cache instance for a key, the other long lived services should not hold one of them.
+    PER_KEY = set([LifeTime.keyed])
+
+    def __init__(self, strict: bool):
+        self._strict = strict
+
+    @classmethod
+    def _is_lifetime(cls, callsite, lifetimes):
+        return isinstance(callsite, LifeTimeCallSite) and callsite.descriptor.lifetime in lifetimes
+
+    def find(self, callsites: typing.Iterable[BaseCallSite]) -> typing.List[str]:
+        '''return the description of each captive dependency.'''
+        captives = []
+        for callsite in callsites:
+            if self._is_lifetime(callsite, self.LONG_LIVED):
+                captives.extend(self._find_from(callsite))
+        return captives
+
+    def _find_from(self, owner: LifeTimeCallSite):
+        short_lived = self.SHORT_LIVED
+        if owner.descriptor.lifetime not in self.PER_KEY:
+            short_lived = short_lived | self.PER_KEY
+        visited = set()
+        pending = [(dep, [owner]) for dep in owner.dependencies]
+        while pending:
+            callsite, chain = pending.pop()
+            if id(callsite) in visited:
+                continue
+            visited.add(id(callsite))
+            chain = chain + [callsite]
+            if self._is_lifetime(callsite, short_lived):
+                path = ' -> '.join(_name_of(x) for x in _distinct_descriptors(chain))
+                yield '{} {} captures {} {} ({})'.format(
+                    owner.descriptor.lifetime.name, _name_of(owner),
+                    callsite.descriptor.lifetime.name, _name_of(callsite),
+                    path)
+            elif not self._is_lifetime(callsite, self.LONG_LIVED):
+                # transient or listed, the owner hold their dependencies too.
+                pending.extend((dep, chain) for dep in callsite.dependencies)
+
+    def check(self, callsites: typing.Iterable[BaseCallSite]):
+        '''raise or warn on captive dependencies.'''
+        captives = self.find(callsites)
+        if not captives:
+            return
+        if self._strict:
+            raise CaptiveDependencyError('; '.join(captives))
+        for captive in captives:
+            warnings.warn(captive, CaptiveDependencyWarning, stacklevel=3)
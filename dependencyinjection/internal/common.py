@@ -14,12 +14,23 @@ class LifeTime(Enum):
     singleton = 0
     scoped = 1
     transient = 2
+    weak = 3
+    keyed = 4
+    refreshable = 5
+    shared = 6
+
+# the parameter of a keyed factory which receive the key.
+KEY_PARAMETER = 'key'
 
 
 class IServiceProvider:
-    def get(self, service_type: type):
+    __slots__ = ()
+
+    def get(self, service_type: type, /, **runtime_args):
         '''
         get service by the type.
+
+        if `runtime_args` is not empty, create a new instance with them.
         '''
         raise NotImplementedError
 
@@ -37,6 +48,8 @@ class IServiceProvider:
 
 
 class ICallSiteMaker:
+    __slots__ = ()
+
     @abstractmethod
     def make_callsite(self, service_provider: IServiceProvider, depend_chain):
         '''create a callsite.'''
@@ -44,6 +57,7 @@ class ICallSiteMaker:
 
 
 class IDescriptor(ICallSiteMaker):
+    __slots__ = ()
 
     @abstractproperty
     def service_type(self) -> type:
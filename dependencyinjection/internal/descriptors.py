@@ -8,20 +8,48 @@
 
 from abc import abstractmethod
 import inspect
-from .common import LifeTime, IServiceProvider, IDescriptor, ICallSiteMaker
+import types
+from .common import LifeTime, IServiceProvider, IDescriptor, ICallSiteMaker, KEY_PARAMETER
 from .param_type_resolver import ParameterTypeResolver
 from .errors import ParameterTypeResolveError
+from .lazy import LazyImport, check_path
 from .callsites import (
+    EMPTY_MAPPING,
     InstanceCallSite,
     ServiceProviderCallSite,
     CallableCallSite,
+    ProfiledCallableCallSite,
     ListedCallSite
 )
 
+# the options which has a few possible values, and the exact type of them.
+_SHAREABLE_OPTIONS = {'auto_exit': bool, 'fork': str}
+_shared_options = {}
+
+def _share_options(options: dict):
+    '''
+    most descriptors has the same options, share them as a immutable mapping.
+
+    only the options in `_SHAREABLE_OPTIONS` are shared, so the table is small and never hold
+    the user objects (like the `key` function); the others have their own mapping.
+    '''
+    if any(type(v) is not _SHAREABLE_OPTIONS.get(k) for k, v in options.items()):
+        return types.MappingProxyType(options)
+    key = tuple(options.items())
+    shared = _shared_options.get(key)
+    if shared is None:
+        shared = _shared_options.setdefault(key, types.MappingProxyType(options))
+    return shared
+
+
 class Descriptor(IDescriptor):
-    def __init__(self, service_type: type, lifetime: LifeTime):
-        if not isinstance(service_type, type):
-            raise TypeError('service_type must be a type')
+    __slots__ = ('_service_type', '_lifetime')
+
+    def __init__(self, service_type: (type, str), lifetime: LifeTime):
+        if isinstance(service_type, str):
+            check_path(service_type)
+        elif not isinstance(service_type, type):
+            raise TypeError('service_type must be a type or a import path')
         if not isinstance(lifetime, LifeTime):
             raise TypeError('lifetime must be a LifeTime')
 
@@ -36,26 +64,70 @@ class Descriptor(IDescriptor):
     def lifetime(self):
         return self._lifetime
 
+    @property
+    def options(self) -> dict:
+        return EMPTY_MAPPING
+
 
 class CallableDescriptor(Descriptor):
-    def __init__(self, service_type: type, func: callable, lifetime: LifeTime, **options):
+    __slots__ = ('_func', '_options', '_lazy_import')
+
+    def __init__(self, service_type: (type, str), func: (callable, str), lifetime: LifeTime, **options):
         super().__init__(service_type, lifetime)
         if service_type is ParameterTypeResolver:
             raise RuntimeError(f'service_type cannot be {ParameterTypeResolver}.')
-        if not callable(func):
+        self._lazy_import = None
+        if isinstance(func, str):
+            # import on first resolve.
+            self._lazy_import = LazyImport(func)
+            func = None
+        elif not callable(func):
             raise TypeError
 
         self._func = func
-        self._options = options
+        self._options = _share_options(options)
 
-    def make_callsite(self, service_provider, depend_chain):
-        param_callsites = {}
+    @property
+    def options(self):
+        return self._options
+
+    def __reduce__(self):
+        # the shared options is a mappingproxy which cannot be pickled.
+        func = self._func if self._func is not None else self._lazy_import.path
+        return (_make_callable_descriptor, (self._service_type, func, self._lifetime, dict(self._options)))
+
+    @property
+    def lazy_import(self) -> LazyImport:
+        ''' the `LazyImport` of the factory, or `None` if it is not registered by import path. '''
+        return self._lazy_import
+
+    def make_callsite(self, service_provider, depend_chain, runtime_names: frozenset=frozenset()):
+        '''
+        create a callsite, the parameters in `runtime_names` are not resolved,
+        they should be passed by `CallableCallSite.invoke()`.
+        '''
+        if self._func is None:
+            func = self._lazy_import.load()
+            if not callable(func):
+                raise TypeError(f'{self._lazy_import.path} is not callable')
+            self._func = func
+        param_callsites = EMPTY_MAPPING
         signature = inspect.signature(self._func)
 
+        if not runtime_names and self._lifetime is LifeTime.keyed and KEY_PARAMETER in signature.parameters:
+            # the key is passed by `KeyedCallSite`.
+            runtime_names = frozenset((KEY_PARAMETER, ))
         params = signature.parameters.values()
-        params = [p for p in params if p.kind is p.POSITIONAL_OR_KEYWORD]
+        if runtime_names:
+            accept_kwargs = any(p.kind is p.VAR_KEYWORD for p in params)
+            names = set(p.name for p in params if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
+            unknown = runtime_names - names
+            if unknown and not accept_kwargs:
+                raise TypeError(f'{self._func} got unexpected arguments: {", ".join(sorted(unknown))}')
+        params = [p for p in params if p.kind is p.POSITIONAL_OR_KEYWORD and p.name not in runtime_names]
         if params:
-            type_resolver: ParameterTypeResolver = service_provider.get(ParameterTypeResolver)
+            param_callsites = {}
+            type_resolver: ParameterTypeResolver = service_provider.type_resolver
             for param in params:
                 callsite = None
                 if param.default is param.empty:
@@ -76,7 +148,8 @@ class CallableDescriptor(Descriptor):
                         callsite = InstanceCallSite(None, param.default)
                 param_callsites[param.name] = callsite
 
-        return CallableCallSite(self, self._func, param_callsites, self._options)
+        callsite_cls = ProfiledCallableCallSite if service_provider.options.get('profile') else CallableCallSite
+        return callsite_cls(self, self._func, param_callsites, self._options)
 
     @staticmethod
     def try_create(service_type: type, func: callable, lifetime: LifeTime, **options):
@@ -88,7 +161,13 @@ class CallableDescriptor(Descriptor):
             return CallableDescriptor(service_type, func, lifetime, **options)
 
 
+def _make_callable_descriptor(service_type, func, lifetime, options):
+    return CallableDescriptor(service_type, func, lifetime, **options)
+
+
 class InstanceDescriptor(Descriptor):
+    __slots__ = ('_instance', )
+
     def __init__(self, service_type: type, instance):
         super().__init__(service_type, LifeTime.singleton)
         if not isinstance(instance, service_type):
@@ -100,6 +179,8 @@ class InstanceDescriptor(Descriptor):
 
 
 class ServiceProviderDescriptor(Descriptor):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(IServiceProvider, LifeTime.scoped)
 
@@ -108,6 +189,8 @@ class ServiceProviderDescriptor(Descriptor):
 
 
 class MapDescriptor(Descriptor):
+    __slots__ = ('_target', )
+
     def __init__(self, service_type: type, target_service_type: type):
         super().__init__(service_type, LifeTime.transient)
         if not isinstance(target_service_type, type):
@@ -119,6 +202,8 @@ class MapDescriptor(Descriptor):
 
 
 class ListedDescriptor(ICallSiteMaker):
+    __slots__ = ('_descriptors', )
+
     def __init__(self, descriptors):
         self._descriptors = tuple(descriptors)
 
@@ -132,4 +217,4 @@ class ListedDescriptor(ICallSiteMaker):
         callsites = []
         for descriptor in self._descriptors:
             callsites.append(service_provider.get_callsite(descriptor, depend_chain))
-        return ListedCallSite(callsites)
+        return ListedCallSite(tuple(callsites))
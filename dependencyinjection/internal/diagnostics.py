@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import sys
+import time
+import typing
+import warnings
+import weakref
+
+from .common import LifeTime
+from .errors import ScopeLeakWarning
+
+
+def _sizeof(obj):
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, '__dict__', None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+    return size
+
+
+class ScopeInfo:
+    ''' a snapshot of the objects which hold by a service provider. '''
+
+    def __init__(self, provider, with_size=False):
+        cached = list(provider._cache_list.values())
+        self.age = time.monotonic() - provider._created_at
+        self.exited = provider._exited
+        self.objects = len(cached)
+        self.exit_count = len(provider._disposables)
+        # the `auto_exit` transients which are exited with the provider.
+        self.transient_exit_count = sum(1 for d, _ in provider._disposables
+                                        if d is not None and d.lifetime is LifeTime.transient)
+        self.contents: typing.Dict[str, int] = {}
+        for obj in cached:
+            name = type(obj).__qualname__
+            self.contents[name] = self.contents.get(name, 0) + 1
+        # shallow size, does not include the objects which referenced by the cached objects.
+        self.size = sum(_sizeof(x) for x in cached) if with_size else None
+
+    def __repr__(self):
+        return '<ScopeInfo age={:.3f}s objects={} exit_count={}>'.format(
+            self.age, self.objects, self.exit_count)
+
+
+class _ScopeRecord:
+    def __init__(self, created_at):
+        self.created_at = created_at
+        self.exited = False
+
+    def reset(self, created_at):
+        ''' the scope is reused by the scope pool. '''
+        self.created_at = created_at
+        self.exited = False
+
+
+class ScopeTracker:
+    ''' track the live scoped providers and warn when a scope was collected without exit. '''
+
+    def __init__(self):
+        self._scopes = weakref.WeakSet()
+
+    def track(self, provider):
+        record = _ScopeRecord(provider._created_at)
+        provider._scope_record = record
+        self._scopes.add(provider)
+        weakref.finalize(provider, ScopeTracker._on_collected, record)
+
+    @staticmethod
+    def _on_collected(record: _ScopeRecord):
+        if not record.exited:
+            age = time.monotonic() - record.created_at
+            msg = 'a scope created {:.3f}s ago was collected without exit.'.format(age)
+            warnings.warn(msg, ScopeLeakWarning)
+
+    def live_scopes(self, with_size=False) -> typing.List[ScopeInfo]:
+        infos = [ScopeInfo(x, with_size) for x in list(self._scopes) if not x._exited]
+        infos.sort(key=lambda x: x.age, reverse=True)
+        return infos
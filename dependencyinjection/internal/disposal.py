@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import threading
+import time
+import typing
+
+from .callsites import BaseCallSite, LifeTimeCallSite
+
+
+class DisposeReport:
+    ''' the result of `ServiceProvider.shutdown()`. '''
+
+    def __init__(self):
+        self.disposed = []
+        self.failed: typing.List[typing.Tuple[object, BaseException]] = []
+        self.timed_out = []
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return not self.failed and not self.timed_out
+
+    def __repr__(self):
+        return '<DisposeReport disposed={} failed={} timed_out={} elapsed={:.3f}s>'.format(
+            len(self.disposed), len(self.failed), len(self.timed_out), self.elapsed)
+
+
+class _DisposeTask(threading.Thread):
+    def __init__(self, obj):
+        # daemon, so a stuck resource cannot block the interpreter exit.
+        super().__init__(name=f'dispose-{type(obj).__name__}', daemon=True)
+        self.obj = obj
+        self.error = None
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        super().start()
+
+    def run(self):
+        try:
+            type(self.obj).__exit__(self.obj, None, None, None)
+        except BaseException as err: # pylint: disable=W0703
+            self.error = err
+
+
+def _find_dependencies(callsite: BaseCallSite, disposable_descriptors: set):
+    ''' find the disposable descriptors which `callsite` depend on. '''
+    found = set()
+    visited = set()
+    pending = list(callsite.dependencies)
+    while pending:
+        dep = pending.pop()
+        if id(dep) in visited:
+            continue
+        visited.add(id(dep))
+        if isinstance(dep, LifeTimeCallSite) and dep.descriptor in disposable_descriptors:
+            found.add(dep.descriptor)
+        else:
+            pending.extend(dep.dependencies)
+    return found
+
+
+def order_waves(disposables: list, callsites: dict) -> typing.List[list]:
+    '''
+    group the disposables (pair of descriptor and obj) into waves,
+    a wave can only be disposed after all the previous waves which depend on it.
+    '''
+    descriptors = set(d for d, _ in disposables if d is not None)
+    # the descriptors which must be disposed before the key.
+    dependents: typing.Dict[object, set] = dict((d, set()) for d in descriptors)
+    for descriptor in descriptors:
+        callsite = callsites.get(descriptor)
+        if callsite is not None:
+            for dep in _find_dependencies(callsite, descriptors - {descriptor}):
+                dependents[dep].add(descriptor)
+
+    levels = {}
+    def level_of(descriptor):
+        level = levels.get(descriptor)
+        if level is None:
+            levels[descriptor] = 0 # cycle guard, cycle dependencies cannot be created.
+            level = max((level_of(x) + 1 for x in dependents[descriptor]), default=0)
+            levels[descriptor] = level
+        return level
+
+    waves: typing.List[list] = []
+    for descriptor, obj in disposables:
+        # the owners of the objects without descriptor are unknown, dispose them first.
+        level = level_of(descriptor) if descriptor is not None else 0
+        while len(waves) <= level:
+            waves.append([])
+        waves[level].append(obj)
+    for wave in waves:
+        wave.reverse() # keep the reversed creation order in each wave.
+    return waves
+
+
+class Disposer:
+    '''
+    dispose waves of objects, each wave in parallel.
+
+    `timeout` limit the seconds for each object,
+    `total_timeout` limit the seconds for all objects.
+    '''
+
+    def __init__(self, max_workers: int=None, timeout: float=None, total_timeout: float=None):
+        if max_workers is not None and max_workers < 1:
+            raise ValueError('max_workers must be greater than 0')
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._total_timeout = total_timeout
+
+    def dispose(self, waves: typing.List[list]) -> DisposeReport:
+        report = DisposeReport()
+        started_at = time.monotonic()
+        deadline = started_at + self._total_timeout if self._total_timeout is not None else None
+
+        for wave in waves:
+            max_workers = self._max_workers or len(wave)
+            for index in range(0, len(wave), max_workers):
+                batch = wave[index:index + max_workers]
+                if deadline is not None and time.monotonic() >= deadline:
+                    report.timed_out.extend(batch)
+                    continue
+                tasks = [_DisposeTask(obj) for obj in batch]
+                for task in tasks:
+                    task.start()
+                for task in tasks:
+                    self._join(task, deadline)
+                    if task.is_alive():
+                        report.timed_out.append(task.obj)
+                    elif task.error is not None:
+                        report.failed.append((task.obj, task.error))
+                    else:
+                        report.disposed.append(task.obj)
+
+        report.elapsed = time.monotonic() - started_at
+        return report
+
+    def _join(self, task: _DisposeTask, deadline):
+        ends = []
+        if self._timeout is not None:
+            ends.append(task.started_at + self._timeout)
+        if deadline is not None:
+            ends.append(deadline)
+        if ends:
+            task.join(max(0, min(ends) - time.monotonic()))
+        else:
+            task.join()
@@ -23,3 +23,31 @@ class TypeNotFoundError(Exception):
 
 class ParameterTypeResolveError(Exception):
     pass
+
+
+class ConfigurationError(Exception):
+    pass
+
+
+class ScopeLevelNotFoundError(Exception):
+    pass
+
+
+class CaptiveDependencyError(Exception):
+    pass
+
+
+class CaptiveDependencyWarning(UserWarning):
+    pass
+
+
+class ScopeLeakWarning(UserWarning):
+    pass
+
+
+class DisposableLimitError(Exception):
+    pass
+
+
+class DisposableLimitWarning(UserWarning):
+    pass
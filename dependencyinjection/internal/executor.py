@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import concurrent.futures
+import pickle
+import typing
+
+# the provider which built by the worker process of the process pool.
+_worker_provider = None
+
+
+def _init_worker(services_data: bytes):
+    global _worker_provider
+    _worker_provider = pickle.loads(services_data).build()
+
+
+def _run_chunk(provider, func, chunk: list):
+    with provider.scope() as scoped_provider:
+        return [scoped_provider.invoke(func, item) for item in chunk]
+
+
+def _run_chunk_in_worker(func, chunk: list):
+    return _run_chunk(_worker_provider, func, chunk)
+
+
+def _run_call(provider, func, args: tuple, kwargs: dict):
+    with provider.scope() as scoped_provider:
+        return scoped_provider.invoke(func, *args, **kwargs)
+
+
+def _run_call_in_worker(func, args: tuple, kwargs: dict):
+    return _run_call(_worker_provider, func, args, kwargs)
+
+
+class ScopedExecutor:
+    '''
+    run callables on a thread pool or a process pool, each task in a new scope,
+    the parameters which are not passed by caller are injected from the scope.
+
+    the process pool workers rebuild the provider from the pickled `Services`,
+    so the registered factories and instances must be picklable.
+    '''
+
+    def __init__(self, provider, max_workers: int=None, kind: str='thread'):
+        self._provider = provider
+        self._is_process = kind == 'process'
+        if kind == 'thread':
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+        elif kind == 'process':
+            services = provider.services
+            if services is None:
+                raise RuntimeError('the provider was not built by `Services.build()`.')
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers, initializer=_init_worker, initargs=(pickle.dumps(services), ))
+        else:
+            raise ValueError("kind must be 'thread' or 'process'")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def submit(self, func, *args, **kwargs) -> concurrent.futures.Future:
+        ''' call `func(*args, **kwargs)` in a new scope, inject the other parameters. '''
+        if self._is_process:
+            return self._executor.submit(_run_call_in_worker, func, args, kwargs)
+        return self._executor.submit(_run_call, self._provider, func, args, kwargs)
+
+    def map(self, func, items: typing.Iterable, *, chunksize: int=1) -> typing.Iterator:
+        '''
+        call `func(item)` for each item, inject the other parameters, yield the results by order.
+
+        the items in a chunk share a scope, use a larger `chunksize` for small tasks.
+        '''
+        if chunksize < 1:
+            raise ValueError('chunksize must be greater than 0')
+        items = list(items)
+        chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+        if self._is_process:
+            futures = [self._executor.submit(_run_chunk_in_worker, func, x) for x in chunks]
+        else:
+            futures = [self._executor.submit(_run_chunk, self._provider, func, x) for x in chunks]
+        def iter_results():
+            for future in futures:
+                yield from future.result()
+        return iter_results()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
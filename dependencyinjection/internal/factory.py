@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import threading
+
+_lock = threading.Lock()
+
+
+class Factory:
+    '''
+    inject `Factory[T]` to create `T` with runtime arguments.
+
+    usage:
+    ``` py
+    class Handler:
+        def __init__(self, db: Database, request_id: str):
+            ...
+
+    class Dispatcher:
+        def __init__(self, handler_factory: Factory[Handler]):
+            handler = handler_factory(request_id='...')
+    ```
+    '''
+    __slots__ = ('_service_provider', )
+    service_type = None
+    _generics = {}
+
+    def __init__(self, service_provider):
+        if self.service_type is None:
+            raise TypeError('use Factory[T] instead of Factory.')
+        self._service_provider = service_provider
+
+    def __call__(self, **runtime_args):
+        return self._service_provider.get(self.service_type, **runtime_args)
+
+    def __class_getitem__(cls, service_type):
+        factory_type = cls._generics.get(service_type)
+        if factory_type is None:
+            with _lock:
+                factory_type = cls._generics.get(service_type)
+                if factory_type is None:
+                    name = getattr(service_type, '__qualname__', str(service_type))
+                    factory_type = type(f'Factory[{name}]', (cls, ), {
+                        '__slots__': (),
+                        'service_type': service_type
+                    })
+                    cls._generics[service_type] = factory_type
+        return factory_type
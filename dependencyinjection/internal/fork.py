@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import os
+import typing
+import weakref
+
+from .callsites import BaseCallSite, LifeTimeCallSite
+
+FORK_SHARE = 'share'
+FORK_RECREATE = 'recreate_after_fork'
+FORK_POLICIES = (FORK_SHARE, FORK_RECREATE)
+
+_root_providers = weakref.WeakSet()
+
+
+def fork_policy(descriptor) -> str:
+    return descriptor.options.get('fork', FORK_SHARE)
+
+
+def unsafe_descriptors(callsites: typing.Iterable[BaseCallSite]) -> set:
+    '''
+    get the descriptors which cannot be shared after fork:
+    the `recreate_after_fork` services and the services which depend on them.
+    '''
+    lifetime_callsites = [x for x in callsites if isinstance(x, LifeTimeCallSite)]
+    unsafe = set(x.descriptor for x in lifetime_callsites if fork_policy(x.descriptor) == FORK_RECREATE)
+    if not unsafe:
+        return unsafe
+
+    def reaches_unsafe(callsite):
+        visited = set()
+        pending = list(callsite.dependencies)
+        while pending:
+            dep = pending.pop()
+            if id(dep) in visited:
+                continue
+            visited.add(id(dep))
+            if isinstance(dep, LifeTimeCallSite) and dep.descriptor in unsafe:
+                return True
+            pending.extend(dep.dependencies)
+        return False
+
+    for callsite in lifetime_callsites:
+        if callsite.descriptor not in unsafe and reaches_unsafe(callsite):
+            unsafe.add(callsite.descriptor)
+    return unsafe
+
+
+def track(provider):
+    ''' let the root provider drop the fork unsafe services in the child process after fork. '''
+    _root_providers.add(provider)
+
+
+def _after_in_child():
+    for provider in list(_root_providers):
+        provider._after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_in_child)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import json
+import typing
+
+from .common import LifeTime
+from .callsites import (
+    BaseCallSite,
+    LifeTimeCallSite,
+    InstanceCallSite,
+    ServiceProviderCallSite,
+    ListedCallSite,
+    CallableCallSite,
+    InterceptedCallSite,
+    ProfiledCallableCallSite
+)
+
+
+def _name_of(obj):
+    return getattr(obj, '__qualname__', None) or getattr(obj, '__name__', None) or str(obj)
+
+
+class GraphNode:
+    ''' a resolved service in the dependency graph. '''
+
+    def __init__(self, node_id: str, callsite: BaseCallSite):
+        self.id = node_id
+        self.callsite = callsite
+        self.dependencies: typing.List[GraphNode] = []
+
+        base = callsite._base_callsite if isinstance(callsite, LifeTimeCallSite) else callsite
+        if isinstance(base, InterceptedCallSite):
+            base = base._base_callsite
+        descriptor = callsite.descriptor
+        self.name = _name_of(descriptor.service_type) if descriptor is not None else 'List'
+        self.lifetime = descriptor.lifetime if descriptor is not None else LifeTime.transient
+
+        self.factory = None
+        self.calls = 0
+        # the average seconds of invoke the factory, `None` if not measured.
+        self.cost = None
+        if isinstance(base, CallableCallSite):
+            self.factory = _name_of(base._func)
+            if isinstance(base, ProfiledCallableCallSite) and base.calls:
+                self.calls = base.calls
+                self.cost = base.total_time / base.calls
+        elif isinstance(base, InstanceCallSite):
+            self.factory = 'instance'
+        elif isinstance(base, ServiceProviderCallSite):
+            self.factory = 'provider'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'lifetime': self.lifetime.name,
+            'factory': self.factory,
+            'cost': self.cost,
+            'calls': self.calls,
+            'dependencies': [x.id for x in self.dependencies],
+        }
+
+
+class DependencyGraph:
+    ''' the resolved dependency graph which build from callsites. '''
+
+    def __init__(self, roots: typing.Dict[object, BaseCallSite], callsites: typing.Iterable[BaseCallSite]=()):
+        self._nodes: typing.Dict[int, GraphNode] = {}
+        self._roots = dict((k, self._node_of(v)) for k, v in roots.items())
+        for callsite in callsites:
+            self._node_of(callsite)
+
+    @staticmethod
+    def _is_node(callsite: BaseCallSite):
+        # parameter default values is not a service.
+        return callsite.descriptor is not None or isinstance(callsite, ListedCallSite)
+
+    def _node_of(self, callsite: BaseCallSite) -> GraphNode:
+        node = self._nodes.get(id(callsite))
+        if node is not None:
+            return node
+        node = GraphNode(f'n{len(self._nodes)}', callsite)
+        self._nodes[id(callsite)] = node
+
+        pending = list(callsite.dependencies)
+        if isinstance(callsite, LifeTimeCallSite):
+            pending = list(callsite._base_callsite.dependencies)
+        for dep in pending:
+            if self._is_node(dep):
+                node.dependencies.append(self._node_of(dep))
+        return node
+
+    @property
+    def nodes(self) -> typing.List[GraphNode]:
+        return list(self._nodes.values())
+
+    def node(self, service_type) -> GraphNode:
+        return self._roots[service_type]
+
+    def fan_out(self, service_type) -> int:
+        ''' get the count of the transitive dependencies of `service_type`. '''
+        visited = set()
+        pending = list(self.node(service_type).dependencies)
+        while pending:
+            node = pending.pop()
+            if node.id not in visited:
+                visited.add(node.id)
+                pending.extend(node.dependencies)
+        return len(visited)
+
+    def critical_path(self, service_type) -> typing.Tuple[float, typing.List[GraphNode]]:
+        '''
+        get the most expensive dependency chain of `service_type`,
+        return the total cost and the nodes from `service_type`.
+
+        the cost of a node without measured is `0`, see `Services.profile()`.
+        '''
+        memo: typing.Dict[str, typing.Tuple[float, list]] = {}
+        def walk(node: GraphNode):
+            if node.id not in memo:
+                best = (0.0, [])
+                for dep in node.dependencies:
+                    best = max(best, walk(dep), key=lambda x: x[0])
+                memo[node.id] = ((node.cost or 0.0) + best[0], [node] + best[1])
+            return memo[node.id]
+        return walk(self.node(service_type))
+
+    def to_dict(self):
+        return {
+            'nodes': [x.to_dict() for x in self._nodes.values()],
+            'roots': dict((_name_of(k), v.id) for k, v in self._roots.items()),
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_dot(self) -> str:
+        lines = ['digraph services {']
+        for node in self._nodes.values():
+            label = f'{node.name}\\n{node.lifetime.name}'
+            if node.cost is not None:
+                label += '\\n{:.3f}ms'.format(node.cost * 1000)
+            lines.append('    {} [label="{}"];'.format(node.id, label.replace('"', '\\"')))
+        for node in self._nodes.values():
+            for dep in node.dependencies:
+                lines.append(f'    {node.id} -> {dep.id};')
+        lines.append('}')
+        return '\n'.join(lines)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import inspect
+import typing
+
+from .cache import LRUCache, MISSING
+from .lock import ThreadLock
+
+# the special methods which forwarded by the proxy if the target type has them.
+_FORWARD_SPECIAL_METHODS = (
+    '__enter__', '__exit__', '__call__', '__len__', '__iter__', '__contains__', '__getitem__',
+)
+
+
+class Interceptor:
+    '''
+    the base class of interceptors which intercept the method calls of a service.
+
+    `bind(target)` is called once for each instance, the result is passed to `invoke()` as `state`,
+    so the state live as long as the instance.
+    '''
+
+    def accept(self, name: str) -> bool:
+        ''' whether intercept the method `name`, default is all public methods. '''
+        return not name.startswith('_')
+
+    def bind(self, target):
+        return None
+
+    def invoke(self, state, name: str, call: typing.Callable, args: tuple, kwargs: dict):
+        return call(*args, **kwargs)
+
+
+class Memoize(Interceptor):
+    '''
+    cache the results of the methods by the arguments,
+    the cache is bounded by `max_entries` and/or `ttl` (seconds) and live as long as the instance,
+    so a scoped service cache for a scope, and a singleton service cache for the process.
+
+    the calls with unhashable arguments are not cached.
+    the names of the methods are required, the other methods (like the mutators) are never cached.
+    '''
+
+    def __init__(self, *methods: str, max_entries: int=None, ttl: float=None):
+        if not methods:
+            raise ValueError('methods are required')
+        if max_entries is not None and max_entries < 1:
+            raise ValueError('max_entries must be greater than 0')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be greater than 0')
+        self._methods = frozenset(methods)
+        self._max_entries = max_entries
+        self._ttl = ttl
+
+    def accept(self, name):
+        return name in self._methods
+
+    def bind(self, target):
+        return LRUCache(self._max_entries, self._ttl)
+
+    def invoke(self, state: LRUCache, name, call, args, kwargs):
+        key = (name, args, tuple(kwargs.items())) if kwargs else (name, args)
+        try:
+            value = state.get(key, MISSING)
+        except TypeError: # unhashable
+            return call(*args, **kwargs)
+        if value is MISSING:
+            value = call(*args, **kwargs)
+            state.set(key, value)
+        return value
+
+
+def _make_call(interceptor: Interceptor, state, name: str, call: typing.Callable):
+    invoke = interceptor.invoke
+    def intercepted(*args, **kwargs):
+        return invoke(state, name, call, args, kwargs)
+    return intercepted
+
+
+def _make_forward(name: str):
+    def forward(self, *args, **kwargs):
+        target = object.__getattribute__(self, '_di_target')
+        return getattr(type(target), name)(target, *args, **kwargs)
+    forward.__name__ = name
+    return forward
+
+
+class _ProxyBase:
+    def __getattr__(self, name):
+        return getattr(object.__getattribute__(self, '_di_target'), name)
+
+    def __setattr__(self, name, value):
+        setattr(object.__getattribute__(self, '_di_target'), name, value)
+
+    def __repr__(self):
+        return f'<proxy of {object.__getattribute__(self, "_di_target")!r}>'
+
+
+_proxy_types: typing.Dict[type, tuple] = {} # target type to (proxy type, method names)
+_proxy_types_lock = ThreadLock()
+
+def proxy_type_of(target_type: type) -> tuple:
+    ''' get or generate the proxy type and the method names for `target_type`. '''
+    entry = _proxy_types.get(target_type)
+    if entry is None:
+        with _proxy_types_lock:
+            entry = _proxy_types.get(target_type)
+            if entry is None:
+                namespace = dict((name, _make_forward(name)) for name in _FORWARD_SPECIAL_METHODS
+                                 if hasattr(target_type, name))
+                # so `isinstance(proxy, target_type)` is `True`.
+                namespace['__class__'] = property(lambda self: target_type)
+                proxy_type = type(f'{target_type.__name__}Proxy', (_ProxyBase, ), namespace)
+                names = tuple(name for name in dir(target_type)
+                              if _is_method(inspect.getattr_static(target_type, name)))
+                entry = _proxy_types[target_type] = (proxy_type, names)
+    return entry
+
+
+def _is_method(attr):
+    if isinstance(attr, (staticmethod, classmethod)):
+        return True
+    return callable(attr) and not isinstance(attr, type)
+
+
+def make_proxy(target, interceptors: typing.Sequence[Interceptor]):
+    '''
+    wrap `target` with a proxy which call the intercepted methods through `interceptors`,
+    the first interceptor is the outermost.
+    '''
+    proxy_type, names = proxy_type_of(type(target))
+    proxy = proxy_type()
+    attrs = vars(proxy)
+    attrs['_di_target'] = target
+    states = [(x, x.bind(target)) for x in interceptors]
+    for name in names:
+        call = None
+        for interceptor, state in reversed(states):
+            if interceptor.accept(name):
+                if call is None:
+                    call = getattr(target, name)
+                call = _make_call(interceptor, state, name, call)
+        if call is not None:
+            attrs[name] = call
+    return proxy
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import importlib
+import time
+
+
+def path_of(service_type: type) -> str:
+    ''' get the import path (`module:qualname`) of a type. '''
+    return f'{service_type.__module__}:{service_type.__qualname__}'
+
+
+def check_path(path: str):
+    module_name, sep, qualname = path.partition(':')
+    if not sep or not module_name or not qualname:
+        raise ValueError(f"import path must be 'module:qualname', got '{path}'")
+    return path
+
+
+class LazyImport:
+    ''' a object which import from a path like `module:qualname` on first `load()`. '''
+
+    def __init__(self, path: str):
+        self._path = check_path(path)
+        self._value = None
+        self._imported = False
+        self._seconds = None
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def imported(self):
+        return self._imported
+
+    @property
+    def seconds(self):
+        ''' the seconds which took by import, `None` if not imported yet. '''
+        return self._seconds
+
+    def load(self):
+        if not self._imported:
+            begin = time.perf_counter()
+            module_name, _, qualname = self._path.partition(':')
+            value = importlib.import_module(module_name)
+            for name in qualname.split('.'):
+                value = getattr(value, name)
+            self._seconds = time.perf_counter() - begin
+            self._value = value
+            self._imported = True
+        return self._value
+
+    def to_dict(self):
+        return {
+            'path': self._path,
+            'imported': self._imported,
+            'seconds': self._seconds,
+        }
+
+    def __repr__(self):
+        return f'LazyImport({self._path!r})'
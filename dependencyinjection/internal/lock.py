@@ -6,12 +6,21 @@
 #
 # ----------
 
+import os
 import threading
+import weakref
 from .common import ILock
 
+_thread_locks = weakref.WeakSet()
+
 class ThreadLock(ILock):
     def __init__(self):
         self._lock = threading.RLock()
+        _thread_locks.add(self)
+
+    def _reset(self):
+        ''' the lock may be held by another thread of the parent process, recreate it. '''
+        self._lock = threading.RLock()
 
     def __enter__(self):
         self._lock.__enter__()
@@ -19,3 +28,11 @@ class ThreadLock(ILock):
 
     def __exit__(self, exc_type, exc_value, traceback):
         self._lock.__exit__(exc_type, exc_value, traceback)
+
+
+def _reset_thread_locks():
+    for lock in list(_thread_locks):
+        lock._reset()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_thread_locks)
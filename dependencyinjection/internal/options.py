@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import dataclasses
+import json
+import os
+import threading
+import typing
+
+from .errors import ConfigurationError
+from .descriptors import InstanceDescriptor
+
+_lock = threading.Lock()
+
+ENV_PREFIX = 'env:'
+# the separator of the nested keys in environment variables, like `APP_DB__HOST`.
+ENV_NESTED_SEPARATOR = '__'
+
+_TRUE_VALUES = frozenset(('1', 'true', 'yes', 'on'))
+_FALSE_VALUES = frozenset(('0', 'false', 'no', 'off', ''))
+
+
+def _set_nested(data: dict, keys: typing.List[str], value):
+    for key in keys[:-1]:
+        data = data.setdefault(key, {})
+        if not isinstance(data, dict):
+            raise ConfigurationError(f'{key} is not a section')
+    data[keys[-1]] = value
+
+
+def load_env(prefix: str, environ: typing.Mapping[str, str]=None) -> dict:
+    ''' load the environment variables which starts with `prefix`, the keys are lower case. '''
+    environ = os.environ if environ is None else environ
+    data = {}
+    for name, value in environ.items():
+        if name.startswith(prefix) and len(name) > len(prefix):
+            keys = name[len(prefix):].lower().split(ENV_NESTED_SEPARATOR)
+            _set_nested(data, keys, value)
+    return data
+
+
+def load_json(path: str) -> dict:
+    ''' load a json file, an empty file is a empty section. '''
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    return json.loads(data) if data else {}
+
+
+def iter_dotenv(lines: typing.Iterable[str]) -> typing.Iterator[typing.Tuple[str, str]]:
+    ''' parse the lines of a `.env` file one by one. '''
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):].lstrip()
+        name, sep, value = line.partition('=')
+        if not sep:
+            raise ConfigurationError(f'line {lineno}: expected `NAME=VALUE`')
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '\'"':
+            value = value[1:-1]
+        else:
+            value = value.split(' #', 1)[0].rstrip()
+        yield name.strip(), value
+
+
+def load_dotenv(path: str) -> dict:
+    with open(path, encoding='utf-8') as fp:
+        return load_env('', dict(iter_dotenv(fp)))
+
+
+def load_source(source) -> dict:
+    '''
+    load the configuration data from `source`:
+
+    - a `dict`;
+    - `'env:PREFIX_'` for the environment variables which starts with `PREFIX_`;
+    - the path of a `.json` file or a `.env` file.
+    '''
+    if isinstance(source, dict):
+        return source
+    if isinstance(source, str):
+        if source.startswith(ENV_PREFIX):
+            return load_env(source[len(ENV_PREFIX):])
+        if source.endswith('.json'):
+            return load_json(source)
+        if os.path.basename(source).startswith('.env') or source.endswith('.env'):
+            return load_dotenv(source)
+    raise ConfigurationError(f'unknown configuration source: {source!r}')
+
+
+def _convert(value, field_type, name: str):
+    origin = typing.get_origin(field_type)
+    if origin is typing.Union:
+        args = [x for x in typing.get_args(field_type) if x is not type(None)]
+        if value is None:
+            return None
+        if len(args) == 1:
+            return _convert(value, args[0], name)
+        return value
+    if dataclasses.is_dataclass(field_type):
+        if not isinstance(value, dict):
+            raise ConfigurationError(f'{name} must be a section')
+        return bind(field_type, value, name + '.')
+    if not isinstance(value, str) or field_type is str:
+        return value
+    try:
+        if field_type is bool:
+            lower = value.lower()
+            if lower in _TRUE_VALUES:
+                return True
+            if lower in _FALSE_VALUES:
+                return False
+            raise ValueError(value)
+        if field_type in (int, float):
+            return field_type(value)
+        if origin in (list, tuple):
+            items = [x.strip() for x in value.split(',') if x.strip()]
+            args = typing.get_args(field_type)
+            if args and args[-1] is not Ellipsis:
+                items = [_convert(x, args[0], name) for x in items]
+            return origin(items)
+    except ValueError:
+        raise ConfigurationError(f'{name}: cannot convert {value!r} to {field_type}')
+    return value
+
+
+def bind(options_type: type, data: dict, path: str='') -> object:
+    ''' create the dataclass `options_type` from `data`, the string values are converted by the field types. '''
+    if not dataclasses.is_dataclass(options_type):
+        raise TypeError(f'{options_type} is not a dataclass')
+    hints = typing.get_type_hints(options_type)
+    kwargs = {}
+    for field in dataclasses.fields(options_type):
+        if not field.init:
+            continue
+        if field.name in data:
+            kwargs[field.name] = _convert(data[field.name], hints.get(field.name, str), path + field.name)
+        elif field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING:
+            raise ConfigurationError(f'missing required option: {path + field.name}')
+    return options_type(**kwargs)
+
+
+class ConfigSource:
+    '''
+    a configuration source which is loaded on first use and reloaded by `reload()`,
+    it is shared by all the options which bound from it.
+    '''
+
+    def __init__(self, source):
+        self._source = source
+        self._lock = threading.Lock()
+        self._data = None
+        self._options: typing.List['Options'] = []
+
+    def __reduce__(self):
+        return (ConfigSource, (self._source, ))
+
+    @property
+    def data(self) -> dict:
+        data = self._data
+        if data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = load_source(self._source)
+                data = self._data
+        return data
+
+    def subscribe(self, options: 'Options'):
+        self._options.append(options)
+
+    def reload(self) -> list:
+        ''' reload the data, returns the options which changed. '''
+        with self._lock:
+            self._data = load_source(self._source)
+        return [x for x in self._options if x.rebind()]
+
+
+class Options:
+    '''
+    inject `Options[T]` to get the current value of the options `T`,
+    which registered by `Services.configure()`, and get notified when it changed.
+
+    inject `T` get the current value when it is resolved.
+    '''
+    __slots__ = ('_source', '_section', '_value', '_callbacks', '__weakref__')
+    options_type = None
+    _generics = {}
+
+    def __init__(self, source: ConfigSource, section: str=None):
+        if self.options_type is None:
+            raise TypeError('use Options[T] instead of Options.')
+        self._source = source
+        self._section = section
+        self._value = None
+        self._callbacks = []
+        source.subscribe(self)
+
+    def __reduce__(self):
+        return (_make_options, (self.options_type, self._source, self._section))
+
+    def _bind(self):
+        data = self._source.data
+        path = ''
+        if self._section:
+            for key in self._section.split('.'):
+                data = data.get(key, {})
+                if not isinstance(data, dict):
+                    raise ConfigurationError(f'{self._section} is not a section')
+            path = self._section + '.'
+        return bind(self.options_type, data, path)
+
+    @property
+    def value(self):
+        value = self._value
+        if value is None:
+            with _lock:
+                if self._value is None:
+                    self._value = self._bind()
+                value = self._value
+        return value
+
+    def get(self):
+        return self.value
+
+    def rebind(self) -> bool:
+        ''' bind the value from the source again, notify the callbacks if it changed. '''
+        value = self._bind()
+        with _lock:
+            old, self._value = self._value, value
+        if old is None or old == value:
+            return False
+        for callback in list(self._callbacks):
+            callback(value)
+        return True
+
+    def reload(self) -> bool:
+        ''' reload the source (and the other options of it), returns whether this options changed. '''
+        return self in self._source.reload()
+
+    def on_change(self, callback: typing.Callable[[object], None]):
+        ''' call `callback(new_value)` after the value changed, can be used as a decorator. '''
+        self._callbacks.append(callback)
+        return callback
+
+    def __class_getitem__(cls, options_type):
+        options_cls = cls._generics.get(options_type)
+        if options_cls is None:
+            with _lock:
+                options_cls = cls._generics.get(options_type)
+                if options_cls is None:
+                    name = getattr(options_type, '__qualname__', str(options_type))
+                    options_cls = type(f'Options[{name}]', (cls, ), {
+                        '__slots__': (),
+                        'options_type': options_type
+                    })
+                    cls._generics[options_type] = options_cls
+        return options_cls
+
+
+def _make_options(options_type, source, section):
+    return Options[options_type](source, section)
+
+
+class OptionsDescriptor(InstanceDescriptor):
+    __slots__ = ()
+
+    def __init__(self, options: Options):
+        super().__init__(type(options), options)
+
+    def __reduce__(self):
+        # the generic type `Options[T]` cannot be pickled by reference.
+        return (OptionsDescriptor, (self._instance, ))
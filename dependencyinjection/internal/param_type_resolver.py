@@ -19,7 +19,7 @@ class ParameterTypeResolver:
     def resolve(self, parameter: inspect.Parameter, allow_none):
         if parameter.annotation is inspect.Parameter.empty:
             typ = self._name_map.get(parameter.name)
-            if typ is None:
+            if typ is None and not allow_none:
                 msg = "cannot resolve parameter type from name: '{}'".format(parameter.name)
                 raise ParameterTypeResolveError(msg)
             return typ
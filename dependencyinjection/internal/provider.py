@@ -7,60 +7,418 @@
 # ----------
 
 import contextlib
+import gc
+import inspect
+import time
 import typing
+import warnings
+import weakref
 from .common import (
     ICallSiteResolver,
     IServiceProvider,
-    IScopedFactory,
     ILock,
+    LifeTime,
     FAKE_LOCK
 )
-from .descriptors import ListedDescriptor, ICallSiteMaker
+from .descriptors import ListedDescriptor, CallableDescriptor, ICallSiteMaker
 from .servicesmap import ServicesMap
 from .checker import CycleChecker
-from .errors import TypeNotFoundError
-from .callsites import LifeTimeCallSite
+from .errors import TypeNotFoundError, DisposableLimitError, DisposableLimitWarning
+from .callsites import (
+    InstanceCallSite,
+    LifeTimeCallSite,
+    SingletonCallSite,
+    WeakCallSite,
+    CallableCallSite,
+    FactoryCallSite,
+    InterceptedCallSite,
+    NoLifeTimeCallSite
+)
+from .factory import Factory
+from .param_type_resolver import ParameterTypeResolver
+from .diagnostics import ScopeInfo, ScopeTracker
+from .graph import DependencyGraph
+from . import fork
+from .disposal import DisposeReport, Disposer, order_waves
+from .cache import LRUCache
+from .refresh import Refresher
+from .shared import SharedSegment, DUMP_METHOD, LOAD_METHOD
+
+def _exit_obj(obj):
+    type(obj).__exit__(obj, None, None, None)
+
 
 INTERNAL_TYPES = set([
     IServiceProvider,
     ILock,
 ])
 
+_LIST_ORIGINS = (list, typing.List)
+
+# the max count of the cached plans of `ServiceProvider.invoke()`.
+MAX_INVOKE_PLANS = 256
+
+def _is_service_type(target):
+    ''' whether `target` is a type, a import path or a `typing.List[T]` instead of a descriptor. '''
+    return isinstance(target, (type, str)) or getattr(target, '__origin__', None) in _LIST_ORIGINS
+
 
 class ServiceProvider(IServiceProvider):
-    def __init__(self, parent_provider: IServiceProvider=None, service_map: ServicesMap=None):
+    __slots__ = (
+        '_root_provider', '_service_map', '_options', '_lock',
+        '_cache_list', '_callsites', '_disposables',
+        '_exited', '_created_at', '_scope_record', '_scope_tracker', '_weak_cache',
+        '_keyed_caches', '_refreshers', '_shared_segments', '_plans', '_invoke_plans', '_resolvers', '_type_resolver', '_specialized', '_pool', '_scope_pool',
+        '_services', '_parent', '_levels', '_children', '__weakref__',
+    )
+
+    def __init__(self, parent_provider: IServiceProvider=None, service_map: ServicesMap=None,
+                 options: dict=None, services=None, level: str=None):
         self._root_provider = parent_provider.root_provider if parent_provider else self
-        self._exit_stack = contextlib.ExitStack()
-        self._exit_stack.__enter__()
+        self._parent = parent_provider
+        # the live nested scopes, exit with this provider.
+        self._children: typing.Dict[weakref.ref, None] = {}
+        # pairs of descriptor and the object which need to exit, by creation order.
+        self._disposables: typing.List[typing.Tuple[object, object]] = []
+        self._exited = False
+        self._created_at = time.monotonic()
+        self._scope_record = None
+        self._pool = None # the pool which this scope return to.
 
         # if service_map is None, parent_provider must not None
         self._service_map = service_map or parent_provider._service_map
         self._cache_list: typing.Dict[object, object] = {} # cached descriptor to instance
-        self._callsites = {}
 
         self._lock = FAKE_LOCK
         if self._root_provider is self:
+            self._callsites = {}
+            self._weak_cache = weakref.WeakValueDictionary() # cached descriptor to `weak` instance
+            self._keyed_caches: typing.Dict[object, LRUCache] = {} # cached descriptor to `keyed` instances
+            self._refreshers: typing.Dict[object, Refresher] = {} # cached descriptor to `refreshable` instance
+            self._shared_segments: typing.Dict[object, SharedSegment] = {} # cached descriptor to segment
+            self._plans: typing.Dict[tuple, CallableCallSite] = {} # cached (type, arg names) to callsite
+            # cached (func, positional count, keyword names) to plan, bounded since the funcs may be closures.
+            self._invoke_plans = LRUCache(MAX_INVOKE_PLANS)
+            self._specialized: typing.List[CallableCallSite] = [] # callsites which bound singletons
+            self._options = options if options is not None else {}
+            self._services = services # the snapshot of `Services` which build this provider.
+            self._scope_pool = None
+            if self._options.get('scope_pool'):
+                from .scopedfactory import ScopePool
+                self._scope_pool = ScopePool(self, self._options['scope_pool'])
+            self._scope_tracker = ScopeTracker() if self._options.get('track_scopes') else None
+            self._levels = {}
+            self._resolvers = None
+            self._type_resolver = None
             self._lock = self.get(ILock)
+            fork.track(self)
+        else:
+            # callsites does not depend on scope, share the table of the root provider.
+            self._callsites = self._root_provider._callsites
+            if self._root_provider._lock is not FAKE_LOCK:
+                # a scope may be used by many threads, but it should not block the others.
+                self._lock = self._root_provider.get(ILock)
+            self._options = self._root_provider._options
+            self._services = None
+            # map level to the nearest scope of it, so a leveled scoped service find the owner in O(1).
+            self._levels = parent_provider._levels
+            if level is not None:
+                self._levels = dict(self._levels)
+                self._levels[level] = self
+            if parent_provider is not self._root_provider:
+                children = parent_provider._children
+                children[weakref.ref(self, lambda ref: children.pop(ref, None))] = None
+            if self._root_provider._scope_tracker is not None:
+                self._root_provider._scope_tracker.track(self)
 
     def __enter__(self):
         return self
 
+    def _mark_exited(self):
+        self._exited = True
+        if self._scope_record is not None:
+            self._scope_record.exited = True
+
+    def _exit_children(self):
+        ''' exit the live nested scopes, the last created first. '''
+        while self._children:
+            ref, _ = self._children.popitem()
+            child = ref()
+            if child is not None and not child._exited:
+                child.__exit__(None, None, None)
+
+    def _detach(self):
+        parent = self._parent
+        if parent is not None and parent is not self._root_provider:
+            parent._children.pop(weakref.ref(self), None)
+
     def __exit__(self, exc_type, exc_value, traceback):
-        self._exit_stack.__exit__(exc_type, exc_value, traceback)
+        exited = self._exited
+        if exited and self._pool is not None:
+            # the tables may be taken over by the next owner.
+            return
+        self._exit_children()
+        self._detach()
+        self._mark_exited()
+        # the root caches are exited first, an error of them does not stop the others.
+        disposables = self._disposables + self._release_root_caches()
+        self._disposables.clear()
+        exit_stack = contextlib.ExitStack()
+        for _, obj in disposables:
+            exit_stack.push(obj)
+        try:
+            exit_stack.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self._cache_list.clear()
+            if self._pool is not None and not exited:
+                self._pool.release(self)
+
+    def shutdown(self, *, max_workers: int=None, timeout: float=None,
+                 total_timeout: float=None) -> DisposeReport:
+        '''
+        exit this provider like `__exit__()`, but exit the independent `auto_exit` services in parallel.
+
+        a service is exited after all the services which depend on it.
+        `timeout` limit the seconds for exit each service, `total_timeout` limit the seconds for all.
+        the errors are collected into the report instead of raised.
+        '''
+        exited = self._exited
+        if exited and self._pool is not None:
+            return DisposeReport()
+        self._exit_children()
+        self._detach()
+        self._mark_exited()
+        disposables = self._disposables + self._release_root_caches()
+        waves = order_waves(disposables, self._root_provider._callsites)
+        self._disposables.clear()
+        disposer = Disposer(max_workers=max_workers, timeout=timeout, total_timeout=total_timeout)
+        report = disposer.dispose(waves)
         self._cache_list.clear()
+        if self._pool is not None and not exited:
+            self._pool.release(self)
+        return report
+
+    def _get_keyed_cache(self, descriptor) -> LRUCache:
+        cache = self._keyed_caches.get(descriptor)
+        if cache is None:
+            with self._lock:
+                cache = self._keyed_caches.get(descriptor)
+                if cache is None:
+                    options = descriptor.options
+                    on_evict = (lambda key, obj: _exit_obj(obj)) if options.get('auto_exit') else None
+                    cache = LRUCache(options.get('max_entries'), options.get('ttl'), on_evict)
+                    self._keyed_caches[descriptor] = cache
+        return cache
+
+    def _start_refresher(self, descriptor, base_callsite) -> Refresher:
+        options = descriptor.options
+        auto_exit = options.get('auto_exit')
+        def factory():
+            obj = base_callsite.get(self)
+            if auto_exit:
+                type(obj).__enter__(obj)
+            return obj
+        refresher = Refresher(factory, options['ttl'], grace=options.get('grace', 0),
+                              retry=options.get('retry'), dispose=_exit_obj if auto_exit else None)
+        self._refreshers[descriptor] = refresher
+        return refresher
+
+    def _attach_shared(self, descriptor, factory):
+        segment = SharedSegment(descriptor.options['name'])
+        def dump():
+            obj = factory()
+            return getattr(type(obj), DUMP_METHOD)(obj)
+        buffer = segment.attach_or_create(dump)
+        try:
+            obj = getattr(descriptor.service_type, LOAD_METHOD)(buffer)
+        except:
+            segment.release()
+            raise
+        self._shared_segments[descriptor] = segment
+        self._cache_list[descriptor] = obj
+        return obj
+
+    def _release_root_caches(self) -> list:
+        '''
+        drop the `keyed` and `refreshable` instances, detach the `shared` instances, unbind the singletons.
+
+        returns the dropped `auto_exit` instances (pair of descriptor and obj) from the oldest,
+        the caller exit them with the disposables.
+        '''
+        disposables = []
+        if self is self._root_provider:
+            self._reset_specializations()
+            for descriptor, cache in list(self._keyed_caches.items()):
+                objs = cache.clear(evict=False)
+                if descriptor.options.get('auto_exit'):
+                    disposables.extend((descriptor, obj) for obj in objs)
+            for descriptor, refresher in list(self._refreshers.items()):
+                objs = refresher.stop(dispose=False)
+                if descriptor.options.get('auto_exit'):
+                    disposables.extend((descriptor, obj) for obj in objs)
+            self._refreshers.clear()
+            segments = list(self._shared_segments.items())
+            self._shared_segments.clear()
+            for descriptor, segment in segments:
+                self._cache_list.pop(descriptor, None)
+                segment.release()
+        return disposables
 
     @property
     def root_provider(self):
         return self._root_provider
 
-    def __getitem__(self, service_type: type):
+    @property
+    def options(self) -> dict:
+        return self._options
+
+    def enter_context(self, obj, descriptor=None):
+        ''' enter `obj` and exit it when this provider exit. '''
+        if self._exited and self._pool is not None:
+            raise RuntimeError('cannot enter context on an exited scope.')
+        result = type(obj).__enter__(obj)
+        self._disposables.append((descriptor, obj))
+        return result
+
+    def _enter_transient(self, obj, descriptor):
+        ''' enter a new instance which owned by this provider, and check the `max_transient_disposables`. '''
+        self.enter_context(obj, descriptor)
+        limit = self._options.get('max_transient_disposables')
+        if limit is not None and len(self._disposables) > limit:
+            self._on_disposables_exceeded(limit)
+
+    def _on_disposables_exceeded(self, limit: int):
+        strict = self._options['max_transient_disposables_strict']
+        if strict:
+            descriptor, obj = self._disposables.pop()
+            _exit_obj(obj)
+            raise DisposableLimitError(
+                f'the provider hold more than {limit} objects to exit, when resolve {descriptor.service_type}.')
+        if len(self._disposables) == limit + 1:
+            warnings.warn(f'the provider hold more than {limit} objects to exit, '
+                          'resolve the `auto_exit` transients from a shorter scope.', DisposableLimitWarning, 4)
+
+    def stats(self, with_size=False) -> ScopeInfo:
+        '''
+        get the object counts of this provider.
+
+        if `with_size` is `True`, also compute the approximate size (shallow) of the cached objects.
+        '''
+        return ScopeInfo(self, with_size)
+
+    def live_scopes(self, with_size=False) -> typing.List[ScopeInfo]:
+        '''
+        list the scopes which are not exited yet, the oldest first.
+
+        require `Services.track_scopes()`.
+        '''
+        tracker = self._root_provider._scope_tracker
+        if tracker is None:
+            raise RuntimeError('scopes tracking is not enabled, call `Services.track_scopes()` first.')
+        return tracker.live_scopes(with_size)
+
+    def __getitem__(self, service_type: (type, str)):
         return self._get(service_type, True)
 
-    def get(self, service_type: type):
+    def get(self, service_type: (type, str), /, **runtime_args):
+        '''
+        get service by the type or the import path (`module:qualname`) of the type.
+
+        if `runtime_args` is not empty, always create a new instance
+        which the parameters in `runtime_args` are passed from it instead of resolved.
+        '''
+        if runtime_args:
+            return self._get_with_args(service_type, runtime_args)
         return self._get(service_type, False)
 
-    def _get(self, service_type: type, required):
-        if not isinstance(service_type, type):
+    def _get_with_args(self, service_type, runtime_args: dict):
+        if self._exited and self._pool is not None:
+            raise RuntimeError('cannot resolve services from an exited scope.')
+        root = self._root_provider
+        key = (service_type, frozenset(runtime_args))
+        callsite = root._plans.get(key)
+        if callsite is None:
+            callsite = root._make_plan(service_type, key[1])
+        obj = callsite.invoke(self, runtime_args)
+        if callsite.options.get('auto_exit'):
+            # a new instance, owned by the resolving provider like the transients.
+            self._enter_transient(obj, callsite.descriptor)
+        return obj
+
+    def _make_plan(self, service_type, runtime_names: frozenset):
+        with self._lock:
+            key = (service_type, runtime_names)
+            callsite = self._plans.get(key)
+            if callsite is None:
+                descriptor = self._service_map.get(service_type)
+                if not isinstance(descriptor, CallableDescriptor):
+                    raise TypeError(f'cannot pass arguments to create {service_type}')
+                with CycleChecker().add_or_raise(descriptor.service_type) as depend_chain:
+                    callsite = descriptor.make_callsite(self, depend_chain, runtime_names)
+                callsite = self._plans.setdefault(key, self._intercept(descriptor, callsite))
+            return callsite
+
+    def invoke(self, func: callable, *args, **kwargs):
+        '''
+        call `func` with `args` and `kwargs`, the other parameters are resolved from this provider.
+        '''
+        root = self._root_provider
+        key = (func, len(args), frozenset(kwargs))
+        plan = root._invoke_plans.get(key)
+        if plan is None:
+            plan = root._make_invoke_plan(key)
+        callsite, names = plan
+        if args:
+            kwargs.update(zip(names, args))
+        return callsite.invoke(self, kwargs)
+
+    def _make_invoke_plan(self, key):
+        with self._lock:
+            plan = self._invoke_plans.get(key, record=False)
+            if plan is None:
+                func, nargs, kw_names = key
+                params = [p for p in inspect.signature(func).parameters.values()
+                          if p.kind is p.POSITIONAL_OR_KEYWORD]
+                if len(params) < nargs:
+                    raise TypeError(f'{func} takes {len(params)} positional arguments but {nargs} were given')
+                names = tuple(p.name for p in params[:nargs])
+                descriptor = CallableDescriptor(type(func), func, LifeTime.transient)
+                with CycleChecker().add_or_raise(descriptor.service_type) as depend_chain:
+                    callsite = descriptor.make_callsite(self, depend_chain, kw_names.union(names))
+                plan = (callsite, names)
+                self._invoke_plans.set(key, plan)
+            return plan
+
+    @property
+    def services(self):
+        ''' a copy of the `Services` which build this provider, or `None` if it is unknown. '''
+        return self._root_provider._services
+
+    def executor(self, max_workers: int=None, kind: str='thread'):
+        '''
+        create a `ScopedExecutor` which run each task in a new scope,
+        `kind` is `'thread'` or `'process'`.
+        '''
+        from .executor import ScopedExecutor
+        return ScopedExecutor(self, max_workers, kind)
+
+    def map(self, func: callable, items: typing.Iterable, *, max_workers: int=None,
+            kind: str='thread', chunksize: int=1) -> list:
+        '''
+        call `func(item)` for each item on a executor, the other parameters are injected,
+        the items in a chunk share a scope.
+        '''
+        with self.executor(max_workers, kind) as executor:
+            return list(executor.map(func, items, chunksize=chunksize))
+
+    def _get(self, service_type: (type, str), required):
+        if self._exited and self._pool is not None:
+            # a pooled scope is reused after it exited, it must not cache any instance.
+            raise RuntimeError('cannot resolve services from an exited scope.')
+        if service_type is IServiceProvider:
+            # fast path, same as `ServiceProviderCallSite`.
+            return self
+        if not _is_service_type(service_type):
             raise TypeError
         callsite = self.get_callsite(service_type, None, required=required)
         if callsite:
@@ -70,16 +428,24 @@ class ServiceProvider(IServiceProvider):
         ''' get or create callsite. '''
         assert target is not None
 
+        callsite = self._callsites.get(target)
+        if callsite is not None:
+            return callsite
+        if self is not self._root_provider:
+            return self._root_provider.get_callsite(target, depend_chain, required=required)
+
         with self._lock:
             callsite = self._callsites.get(target)
             if callsite is None:
-                if self is not self._root_provider:
-                    callsite = self._root_provider.get_callsite(target, depend_chain)
-                elif isinstance(target, type):
+                if _is_service_type(target):
                     callsite = self._get_callsite_from_service_type(target, depend_chain, required=required)
                 else:
                     callsite = self._get_callsite_from_descriptor(target, depend_chain)
-                self._callsites[target] = callsite
+                if callsite is None:
+                    return None
+                # without the lock, another thread may publish a callsite of the same target first,
+                # all threads should use the first one.
+                callsite = self._callsites.setdefault(target, callsite)
             return callsite
 
     def _get_callsite_from_service_type(self, service_type, depend_chain, *, required):
@@ -88,22 +454,47 @@ class ServiceProvider(IServiceProvider):
         if descriptor:
             return self.get_callsite(descriptor, depend_chain)
 
-        elif getattr(service_type, '__origin__', None) is typing.List and isinstance(service_type.__args__, tuple):
+        elif getattr(service_type, '__origin__', None) in _LIST_ORIGINS and isinstance(service_type.__args__, tuple):
             # list[?]
             inner_type, = service_type.__args__
             descriptors = self._service_map.getall(inner_type) or []
             return self.get_callsite(ListedDescriptor(descriptors), depend_chain)
 
-        for resolver in self[typing.List[ICallSiteResolver]]:
-            callsite = resolver.resolve(service_type, depend_chain)
-            if callsite:
-                return callsite
+        elif isinstance(service_type, type) and issubclass(service_type, Factory) \
+            and service_type.service_type is not None:
+            # Factory[?]
+            return FactoryCallSite(service_type)
+
+        # a import path is a registered name only, the resolvers accept the types.
+        if not isinstance(service_type, str):
+            for resolver in self._get_resolvers():
+                callsite = resolver.resolve(service_type, depend_chain)
+                if callsite:
+                    return callsite
 
         if required:
             raise TypeNotFoundError(f'cannot get type: {service_type}')
 
         return None
 
+    def _get_resolvers(self) -> tuple:
+        ''' get the `ICallSiteResolver`s, they are resolved once. '''
+        resolvers = self._resolvers
+        if resolvers is None:
+            descriptors = self._service_map.getall(ICallSiteResolver) or ()
+            resolvers = tuple(self.get_callsite(d, None).get(self) for d in descriptors)
+            self._resolvers = resolvers
+        return resolvers
+
+    @property
+    def type_resolver(self) -> ParameterTypeResolver:
+        ''' the `ParameterTypeResolver` which used to create callsites, it is resolved once. '''
+        root = self._root_provider
+        type_resolver = root._type_resolver
+        if type_resolver is None:
+            type_resolver = root._type_resolver = root.get(ParameterTypeResolver)
+        return type_resolver
+
     def _get_callsite_from_descriptor(self, descriptor, depend_chain):
         return self.make_callsite(descriptor, depend_chain, from_type=not isinstance(descriptor, ListedDescriptor))
 
@@ -118,9 +509,261 @@ class ServiceProvider(IServiceProvider):
 
             context = depend_chain.add_or_raise(descriptor.service_type) if from_type else FAKE_LOCK
             with context:
-                callsite = descriptor.make_callsite(self, depend_chain)
+                callsite = self._intercept(descriptor, descriptor.make_callsite(self, depend_chain))
                 callsite = LifeTimeCallSite.wrap(descriptor, callsite)
                 return callsite
 
-    def scope(self):
-        return self.get(IScopedFactory).service_provider
+    def _intercept(self, descriptor, callsite):
+        ''' wrap `callsite` with the interceptors of the service, if any. '''
+        interceptors = self._options.get('interceptors')
+        if interceptors and not isinstance(callsite, NoLifeTimeCallSite):
+            service_interceptors = interceptors.get(getattr(descriptor, 'service_type', None))
+            if service_interceptors:
+                return InterceptedCallSite(descriptor, callsite, service_interceptors)
+        return callsite
+
+    def compile(self) -> typing.List[LifeTimeCallSite]:
+        ''' create the callsites of all registered services. '''
+        return [self.get_callsite(d, None) for d in self._service_map.descriptors()]
+
+    def import_report(self) -> typing.List[dict]:
+        '''
+        get the factories which registered by import path, include whether they are imported
+        and the seconds which took by import.
+        '''
+        return [x.to_dict() for x in self._service_map.lazy_imports()]
+
+    def weak_stats(self) -> typing.Dict[object, dict]:
+        '''
+        get the counters of the `weak` services which are resolved:
+        `hits` is the count of reused instances, `creates` is the count of created instances,
+        `alive` is whether the instance is still alive.
+        '''
+        root = self._root_provider
+        stats = {}
+        for callsite in list(root._callsites.values()):
+            if isinstance(callsite, WeakCallSite) and callsite.descriptor.service_type not in stats:
+                stats[callsite.descriptor.service_type] = {
+                    'hits': callsite.hits,
+                    'creates': callsite.creates,
+                    'alive': callsite.descriptor in root._weak_cache,
+                }
+        return stats
+
+    def keyed_stats(self) -> typing.Dict[object, dict]:
+        '''
+        get the metrics of the LRU cache of each `keyed` service which are resolved,
+        include `size`, `hits`, `misses`, `evictions` and `expirations`.
+        '''
+        root = self._root_provider
+        return dict((d.service_type, c.stats()) for d, c in list(root._keyed_caches.items()))
+
+    def refreshable_stats(self) -> typing.Dict[object, dict]:
+        '''
+        get the counters of each `refreshable` service which are resolved,
+        include `refreshes`, `failures` and `last_error`.
+        '''
+        root = self._root_provider
+        return dict((d.service_type, r.stats()) for d, r in list(root._refreshers.items()))
+
+    def shared_stats(self) -> typing.Dict[object, dict]:
+        '''
+        get the segments of each `shared` service which are resolved,
+        include `name`, `size` and `refcount` (the count of the attached providers in all alive processes).
+        '''
+        root = self._root_provider
+        return dict((d.service_type, s.stats()) for d, s in list(root._shared_segments.items()))
+
+    def graph(self) -> DependencyGraph:
+        '''
+        get the resolved dependency graph of all registered services.
+
+        the construction cost of the services is measured after `Services.profile()`.
+        '''
+        callsites = self.compile()
+        roots = dict((t, self.get_callsite(t, None)) for t in self._service_map.service_types())
+        return DependencyGraph(roots, callsites)
+
+    def warmup(self, *, freeze=False) -> int:
+        '''
+        create all singleton services which can be shared after fork, return the count of them.
+
+        call it in the parent process before fork, so the workers start with the shared copy.
+        if `freeze` is `True`, also call `gc.freeze()` to keep the copy-on-write memory shared.
+        '''
+        root = self._root_provider
+        callsites = root.compile()
+        unsafe = fork.unsafe_descriptors(callsites)
+        count = 0
+        for callsite in callsites:
+            if isinstance(callsite, SingletonCallSite) and callsite.descriptor not in unsafe:
+                callsite.get(root)
+                count += 1
+        if freeze:
+            gc.freeze()
+        return count
+
+    @contextlib.contextmanager
+    def override(self, overrides: typing.Dict[type, object]):
+        '''
+        resolve the service types in `overrides` as the given objects (like fakes for tests) in the context.
+
+        the services which depend on the overridden services are recreated in the context,
+        the other callsites and the singletons are reused; all of them are restored on exit.
+        if this provider is a scope, the scoped services which cached by it (and its parents) are recreated too.
+        the scopes which created in the context should exit in it.
+        '''
+        root = self._root_provider
+        with root._lock:
+            state = root._apply_overrides(overrides)
+        scopes = []
+        provider = self
+        while provider is not root:
+            # without the root lock, the scope lock is taken before the root lock on resolve.
+            scopes.append((provider, provider._evict_overridden(state['descriptors'])))
+            provider = provider._parent
+        try:
+            yield self
+        finally:
+            try:
+                for scope, scope_state in scopes:
+                    scope._restore_evicted(state['descriptors'], scope_state)
+            finally:
+                with root._lock:
+                    root._restore_overrides(state)
+
+    def _evict_overridden(self, descriptors: set) -> tuple:
+        ''' drop the scoped instances of the affected `descriptors`, returns the state for restore. '''
+        with self._lock:
+            popped = dict((d, self._cache_list.pop(d)) for d in descriptors if d in self._cache_list)
+            return popped, len(self._disposables)
+
+    def _restore_evicted(self, descriptors: set, state: tuple):
+        popped, count = state
+        with self._lock:
+            created = self._disposables[count:]
+            del self._disposables[count:]
+            self._disposables.extend(x for x in created if x[0] not in descriptors)
+            for descriptor in descriptors:
+                self._cache_list.pop(descriptor, None)
+            self._cache_list.update(popped)
+        with contextlib.ExitStack() as exit_stack:
+            for descriptor, obj in created:
+                if descriptor in descriptors:
+                    exit_stack.push(obj)
+
+    def _apply_overrides(self, overrides: dict) -> dict:
+        table = self._callsites
+        overridden = set(id(table[t]) for t in overrides if t in table)
+        # find the callsites which depend on the overridden callsites.
+        memo = dict((x, True) for x in overridden)
+        def is_affected(callsite):
+            key = id(callsite)
+            affected = memo.get(key)
+            if affected is None:
+                affected = memo[key] = any(is_affected(x) for x in callsite.dependencies)
+            return affected
+        affected_keys = [k for k, v in table.items() if is_affected(v)]
+        descriptors = set(table[k].descriptor for k in affected_keys) - {None}
+
+        state = {
+            'callsites': dict(table),
+            'plans': dict(self._plans),
+            'disposables': len(self._disposables),
+            'descriptors': descriptors,
+            'caches': [],
+        }
+        for key in affected_keys:
+            del table[key]
+        self._plans.clear()
+        self._invoke_plans.clear()
+        for cache in (self._cache_list, self._weak_cache, self._keyed_caches, self._refreshers):
+            popped = dict((d, cache.pop(d)) for d in descriptors if d in cache)
+            state['caches'].append((cache, popped))
+        for service_type, obj in overrides.items():
+            table[service_type] = InstanceCallSite(None, obj)
+        return state
+
+    def _restore_overrides(self, state: dict):
+        descriptors = state['descriptors']
+        # exit the objects which created in the context.
+        created = self._disposables[state['disposables']:]
+        del self._disposables[state['disposables']:]
+        self._disposables.extend(x for x in created if x[0] not in descriptors)
+        try:
+            exit_stack = contextlib.ExitStack()
+            for descriptor, obj in created:
+                if descriptor in descriptors:
+                    exit_stack.push(obj)
+            for descriptor, cache in list(self._keyed_caches.items()):
+                if descriptor in descriptors:
+                    cache.clear()
+            for descriptor, refresher in list(self._refreshers.items()):
+                if descriptor in descriptors:
+                    refresher.stop()
+            exit_stack.close()
+        finally:
+            for cache, popped in state['caches']:
+                for descriptor in descriptors:
+                    cache.pop(descriptor, None)
+                cache.update(popped)
+            self._callsites.clear()
+            self._callsites.update(state['callsites'])
+            self._plans.clear()
+            self._plans.update(state['plans'])
+            self._invoke_plans.clear()
+            # drop the callsites which created in the context.
+            alive = set()
+            pending = list(self._callsites.values())
+            while pending:
+                callsite = pending.pop()
+                if id(callsite) not in alive:
+                    alive.add(id(callsite))
+                    pending.extend(callsite.dependencies)
+            for callsite in self._specialized:
+                if id(callsite) not in alive:
+                    callsite.reset_specialization()
+            self._specialized = [x for x in self._specialized if id(x) in alive]
+
+    def _reset_specializations(self):
+        ''' unbind the singletons from the callsites, call it after the cached singletons changed. '''
+        specialized, self._specialized = self._specialized, []
+        for callsite in specialized:
+            callsite.reset_specialization()
+
+    def _after_fork(self):
+        ''' drop the `recreate_after_fork` and `refreshable` services in the child process, retain the `shared` services. '''
+        # the child process has only one thread now, so there is no lock.
+        self._reset_specializations()
+        # the refresh threads are not exists in the child process, recreate them on next resolve.
+        self._refreshers.clear()
+        # the child process attach to the shared memory too.
+        for segment in self._shared_segments.values():
+            segment.retain()
+        unsafe = fork.unsafe_descriptors(list(self._callsites.values()))
+        if not unsafe:
+            return
+        for descriptor in unsafe:
+            self._cache_list.pop(descriptor, None)
+            self._weak_cache.pop(descriptor, None)
+            cache = self._keyed_caches.pop(descriptor, None)
+            if cache is not None:
+                cache.clear(evict=False)
+        # the parent process still own them.
+        self._disposables = [x for x in self._disposables if x[0] not in unsafe]
+
+    def scope(self, level: str=None):
+        '''
+        create a scope which nested in this provider.
+
+        the scoped services which registered with the same `level`
+        are shared by the scope and the scopes which nested in it.
+        a nested scope is exited when the outer scope exit.
+        '''
+        if self._exited and self._pool is not None:
+            raise RuntimeError('cannot create scope from an exited scope.')
+        pool = self._root_provider._scope_pool
+        if pool is not None and level is None and self is self._root_provider:
+            return pool.acquire()
+        # same as `self.get(IScopedFactory).service_provider`, without create the factory.
+        return ServiceProvider(parent_provider=self, level=level)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import threading
+import time
+import typing
+
+
+class Refresher:
+    '''
+    hold the current instance of a refreshable service,
+    and recreate it on a background thread every `ttl` seconds.
+
+    if recreate failed, keep the last good instance and retry after `retry` seconds.
+    the replaced instances are disposed by `dispose(obj)` after `grace` seconds,
+    the errors of recreate and dispose are counted as `failures`.
+    '''
+
+    def __init__(self, factory: typing.Callable[[], object], ttl: float, *,
+                 grace: float=0, retry: float=None, dispose: typing.Callable[[object], None]=None):
+        self._factory = factory
+        self._ttl = ttl
+        self._grace = grace
+        self._retry = retry if retry is not None else ttl
+        self._dispose = dispose
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._retiring: typing.List[typing.Tuple[float, object]] = []
+
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        # create the first instance in the caller thread, so the errors are raised to it.
+        self.current = factory()
+
+        name = f'refresh-{getattr(factory, "__qualname__", "service")}'
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_refresh = time.monotonic() + self._ttl
+        while True:
+            wake_at = min([next_refresh] + [x for x, _ in self._retiring])
+            if self._stopped.wait(max(0, wake_at - time.monotonic())):
+                return
+            now = time.monotonic()
+            if now >= next_refresh:
+                next_refresh = self._refresh(now)
+            self._dispose_retired(time.monotonic())
+
+    def _refresh(self, now):
+        try:
+            obj = self._factory()
+        except Exception as err: # pylint: disable=W0703
+            self.failures += 1
+            self.last_error = err
+            return now + self._retry
+        with self._lock:
+            stopped = self._stopped.is_set()
+            if not stopped:
+                self._retiring.append((now + self._grace, self.current))
+                self.current = obj
+                self.refreshes += 1
+        if stopped:
+            # stopped while creating, nobody own it.
+            self._dispose_safely(obj)
+        return time.monotonic() + self._ttl
+
+    def _dispose_safely(self, obj):
+        ''' dispose on the background thread, the errors are recorded instead of stop the thread. '''
+        if self._dispose is None:
+            return
+        try:
+            self._dispose(obj)
+        except Exception as err: # pylint: disable=W0703
+            self.failures += 1
+            self.last_error = err
+
+    def _dispose_retired(self, now):
+        with self._lock:
+            due = [obj for at, obj in self._retiring if at <= now]
+            self._retiring = [x for x in self._retiring if x[0] > now]
+        for obj in due:
+            self._dispose_safely(obj)
+
+    def stop(self, dispose=True) -> list:
+        '''
+        stop the background thread, and dispose all instances if `dispose` is `True`;
+        returns the instances from the oldest, so the caller can dispose them if `dispose` is `False`.
+        '''
+        with self._lock:
+            self._stopped.set()
+            retiring = [obj for _, obj in self._retiring] + [self.current]
+            self._retiring = []
+        if dispose and self._dispose is not None:
+            for obj in retiring:
+                self._dispose(obj)
+        return retiring
+
+    def stats(self) -> dict:
+        return {
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import importlib
+import pkgutil
+import types
+import typing
+
+from .common import LifeTime
+
+MARKER = '__di_service__'
+
+
+def to_lifetime(lifetime: (LifeTime, str)) -> LifeTime:
+    if isinstance(lifetime, str):
+        try:
+            return LifeTime[lifetime]
+        except KeyError:
+            raise ValueError(f'unknown lifetime: {lifetime!r}')
+    if not isinstance(lifetime, LifeTime):
+        raise TypeError('lifetime must be a LifeTime')
+    return lifetime
+
+
+def mark(obj, lifetime: LifeTime, service_type: type=None, options: dict=None):
+    ''' mark `obj` as a service, so `Services.scan()` can discover it. '''
+    setattr(obj, MARKER, (service_type, lifetime, options or {}))
+    return obj
+
+
+def injectable(lifetime: (LifeTime, str)=LifeTime.transient, service_type: type=None, **options):
+    '''
+    mark a class (or a factory with `service_type`) as a service without register it,
+    register it later by `Services.scan()`.
+
+    usage:
+    ``` py
+    @injectable('singleton')
+    class A:
+        pass
+    ```
+    '''
+    lifetime = to_lifetime(lifetime)
+    def func(obj):
+        if not isinstance(service_type or obj, type):
+            raise TypeError('service type canbe ignore only args is a type.')
+        return mark(obj, lifetime, service_type, options)
+    return func
+
+
+def _iter_modules(module: types.ModuleType, recursive: bool):
+    yield module
+    path = getattr(module, '__path__', None)
+    if recursive and path is not None:
+        for info in pkgutil.walk_packages(path, module.__name__ + '.'):
+            yield importlib.import_module(info.name)
+
+
+def scan(module: (types.ModuleType, str), recursive=True) -> typing.Iterable[tuple]:
+    '''
+    find the marked services which defined in `module` (and the submodules if it is a package),
+    yield specs for `Services.add_many()`.
+    '''
+    if isinstance(module, str):
+        module = importlib.import_module(module)
+    for mod in _iter_modules(module, recursive):
+        for obj in list(vars(mod).values()):
+            # do not inherit the marker from base classes, and skip the imported objects.
+            attrs = getattr(obj, '__dict__', None)
+            if not attrs or MARKER not in attrs or getattr(obj, '__module__', None) != mod.__name__:
+                continue
+            service_type, lifetime, options = attrs[MARKER]
+            yield (service_type or obj, obj, lifetime, options)
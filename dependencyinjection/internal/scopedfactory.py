@@ -6,6 +6,9 @@
 #
 # ----------
 
+import collections
+import time
+
 from .common import IScopedFactory, IServiceProvider
 from .provider import ServiceProvider
 
@@ -16,3 +19,52 @@ class ScopedFactory(IScopedFactory):
     @property
     def service_provider(self):
         return self._service_provider
+
+
+class ScopePool:
+    '''
+    reuse the exited scoped providers of the root provider.
+
+    a scope is reset when it exit, the pool keep `max_size` idle scopes at most.
+    each owner get a new provider object which take over the tables of the idle one,
+    so the stale references of the last owner stay exited and never see the instances of the next owner.
+    '''
+
+    # the attributes which are moved to the new provider object.
+    _TAKEN_OVER = ('_root_provider', '_parent', '_service_map', '_options', '_lock', '_callsites',
+                   '_services', '_levels', '_cache_list', '_disposables', '_children')
+
+    def __init__(self, root_provider: ServiceProvider, max_size: int):
+        self._root_provider = root_provider
+        self._idle = collections.deque(maxlen=max_size)
+        self.creates = 0
+        self.reuses = 0
+
+    def acquire(self) -> ServiceProvider:
+        try:
+            idle = self._idle.pop()
+        except IndexError:
+            provider = ServiceProvider(parent_provider=self._root_provider)
+            self.creates += 1
+        else:
+            provider = ServiceProvider.__new__(ServiceProvider)
+            for name in self._TAKEN_OVER:
+                setattr(provider, name, getattr(idle, name))
+            idle._cache_list, idle._disposables, idle._children = {}, [], {}
+            provider._exited = False
+            provider._created_at = time.monotonic()
+            provider._scope_record = None
+            tracker = self._root_provider._scope_tracker
+            if tracker is not None:
+                tracker.track(provider)
+            self.reuses += 1
+        provider._pool = self
+        return provider
+
+    def release(self, provider: ServiceProvider):
+        ''' return a exited scope, it must not hold any instance. '''
+        assert not provider._cache_list and not provider._disposables
+        self._idle.append(provider)
+
+    def __len__(self):
+        return len(self._idle)
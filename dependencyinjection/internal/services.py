@@ -7,6 +7,7 @@
 # ----------
 
 import typing
+import uuid
 from overload import overload
 from .common import (
     LifeTime,
@@ -25,26 +26,91 @@ from .descriptors import (
 from .servicesmap import ServicesMap
 from .lock import ThreadLock
 from .param_type_resolver import ParameterTypeResolver
+from .checker import LifeTimeChecker
+from .fork import FORK_SHARE, FORK_POLICIES
+from .scanner import mark, scan, to_lifetime
+from .intercept import Interceptor
+from .options import ConfigSource, Options, OptionsDescriptor
+from .shared import check_protocol
 
 
 class Services:
     def __init__(self):
         self._services: typing.List[Descriptor] = []
         self._name_map: typing.Dict[str, type] = {}
+        self._options = {}
+        self._interceptors: typing.Dict[object, list] = {}
+        self._config_sources: typing.Dict[str, ConfigSource] = {}
+        self._built: tuple = None # the cached service map of `build()`
         self.instance(ILock, FAKE_LOCK)
 
     def _add_descriptor(self, descriptor):
         self._services.append(descriptor)
         return self
 
-    def add(self, service_type: type, obj: (callable, type), lifetime: LifeTime, *,
-            auto_exit=False):
+    def add(self, service_type: (type, str), obj: (callable, type, str), lifetime: LifeTime, *,
+            auto_exit=False, fork=FORK_SHARE):
         '''
         add a factory for service_type with lifetime.
 
-        if `auto_exit` is `True`, auto call `obj.__exit__` when scoped provider call `__exit__`.
+        if `auto_exit` is `True`, auto call `obj.__exit__` when scoped provider call `__exit__`;
+        a transient is exited with the provider which resolve it.
+
+        `fork` is the policy of the created instance after `os.fork()`:
+        `'share'` keep the instance which created by the parent process;
+        `'recreate_after_fork'` create a new instance in the child process.
+        '''
+        return self._add_descriptor(self._make_descriptor(service_type, obj, lifetime,
+                                                          auto_exit=auto_exit, fork=fork))
+
+    @staticmethod
+    def _make_descriptor(service_type, obj, lifetime: LifeTime, *, auto_exit=False, fork=FORK_SHARE,
+                         **options):
+        if fork not in FORK_POLICIES:
+            raise ValueError(f'fork must be one of {FORK_POLICIES}')
+        if auto_exit and lifetime is LifeTime.weak:
+            raise ValueError('a weak service cannot be auto exit, the provider would hold it forever.')
+        if lifetime is LifeTime.weak and isinstance(obj, type) and not obj.__weakrefoffset__:
+            raise TypeError(f'{obj} cannot be weakly referenced, it cannot be a weak service.')
+        if lifetime is LifeTime.keyed and not callable(options.get('key')):
+            raise TypeError('key must be a callable for keyed service.')
+        if lifetime is LifeTime.refreshable and (options.get('ttl') or 0) <= 0:
+            raise ValueError('ttl must be greater than 0')
+        if lifetime is LifeTime.shared:
+            check_protocol(service_type)
+            if auto_exit:
+                raise ValueError('a shared service cannot be auto exit, it is owned by the shared memory.')
+            if not options.get('name'):
+                options['name'] = f'di_{uuid.uuid4().hex[:16]}'
+        return CallableDescriptor(service_type, obj, lifetime, auto_exit=auto_exit, fork=fork, **options)
+
+    def add_many(self, specs: typing.Iterable[tuple]):
+        '''
+        add many factories at once.
+
+        each spec is `(service_type, obj, lifetime)` or `(service_type, obj, lifetime, options)`,
+        `obj` can be `None` if `service_type` is the factory itself,
+        `lifetime` can be a `LifeTime` or the name of it, `options` is the keyword arguments of `add()`.
+        '''
+        make_descriptor = self._make_descriptor
+        descriptors = []
+        for spec in specs:
+            service_type, obj, lifetime, *rest = spec
+            options = rest[0] if rest else {}
+            if obj is None:
+                obj = service_type
+            if lifetime.__class__ is not LifeTime:
+                lifetime = to_lifetime(lifetime)
+            descriptors.append(make_descriptor(service_type, obj, lifetime, **options))
+        self._services.extend(descriptors)
+        return self
+
+    def scan(self, module, recursive=True):
+        '''
+        import `module` (a module or the name of it) and the submodules if `recursive` is `True`,
+        add the services which marked by `injectable()` or the `Decorator` helpers.
         '''
-        return self._add_descriptor(CallableDescriptor(service_type, obj, lifetime, auto_exit=auto_exit))
+        return self.add_many(scan(module, recursive))
 
     @overload
     def instance(self, service_type: type, obj: object):
@@ -58,34 +124,128 @@ class Services:
         return self.instance(type(obj), obj)
 
     @overload
-    def singleton(self, service_type: type, obj: callable, **kwargs):
+    def singleton(self, service_type: (type, str), obj: (callable, str), **kwargs):
         '''
         register a singleton type.
+
+        both `service_type` and `obj` can be a import path like `module:qualname`,
+        which is not imported until the service is resolved.
         '''
         return self.add(service_type, obj, LifeTime.singleton, **kwargs)
 
     @singleton.add
-    def singleton(self, service_type: type, **kwargs):
+    def singleton(self, service_type: (type, str), **kwargs):
         return self.singleton(service_type, service_type, **kwargs)
 
     @overload
-    def scoped(self, service_type: type, obj: (callable, type), **kwargs):
-        ''' register a scoped type. '''
+    def scoped(self, service_type: (type, str), obj: (callable, type, str), **kwargs):
+        '''
+        register a scoped type.
+
+        if `level` is given, the instance is shared in the nearest scope
+        which created by `scope(level=level)`, include the scopes nested in it.
+        '''
+        level = kwargs.pop('level', None)
+        if level is not None:
+            descriptor = self._make_descriptor(service_type, obj, LifeTime.scoped, level=level, **kwargs)
+            return self._add_descriptor(descriptor)
         return self.add(service_type, obj, LifeTime.scoped, **kwargs)
 
     @scoped.add
-    def scoped(self, service_type: type, **kwargs):
+    def scoped(self, service_type: (type, str), **kwargs):
         return self.scoped(service_type, service_type, **kwargs)
 
     @overload
-    def transient(self, service_type: type, obj: (callable, type), **kwargs):
+    def transient(self, service_type: (type, str), obj: (callable, type, str), **kwargs):
         ''' register a transient type. '''
         return self.add(service_type, obj, LifeTime.transient, **kwargs)
 
     @transient.add
-    def transient(self, service_type: type, **kwargs):
+    def transient(self, service_type: (type, str), **kwargs):
         return self.transient(service_type, service_type, **kwargs)
 
+    @overload
+    def weak(self, service_type: (type, str), obj: (callable, type, str), **kwargs):
+        '''
+        register a weak type.
+
+        the instance is shared while it is referenced by anyone,
+        and a new instance is created after it was collected.
+        '''
+        return self.add(service_type, obj, LifeTime.weak, **kwargs)
+
+    @weak.add
+    def weak(self, service_type: (type, str), **kwargs):
+        return self.weak(service_type, service_type, **kwargs)
+
+    def keyed(self, service_type: (type, str), obj: (callable, type, str)=None, *,
+              key: typing.Callable[[IServiceProvider], object],
+              max_entries: int=None, ttl: float=None, **kwargs):
+        '''
+        register a keyed type: a singleton per key (like tenant) which returned by `key(service_provider)`.
+        `key()` is called with the provider which request it, but the instance is created from the root provider;
+        the factory receive the key by the parameter `key` if it has one.
+
+        the instances are cached by a LRU cache which bounded by `max_entries` and/or `ttl` (seconds),
+        the evicted instances are exited if `auto_exit` is `True`.
+        '''
+        if max_entries is not None and max_entries < 1:
+            raise ValueError('max_entries must be greater than 0')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be greater than 0')
+        descriptor = self._make_descriptor(service_type, obj or service_type, LifeTime.keyed,
+                                           key=key, max_entries=max_entries, ttl=ttl, **kwargs)
+        return self._add_descriptor(descriptor)
+
+    def refreshable(self, service_type: (type, str), obj: (callable, type, str)=None, *,
+                    ttl: float, grace: float=0, retry: float=None, **kwargs):
+        '''
+        register a refreshable type: a singleton which recreated by a background thread every `ttl` seconds.
+
+        the readers always get the current instance without blocking.
+        if recreate failed, keep the last good instance and retry after `retry` seconds (default `ttl`).
+        if `auto_exit` is `True`, the replaced instance is exited after `grace` seconds.
+        '''
+        descriptor = self._make_descriptor(service_type, obj or service_type, LifeTime.refreshable,
+                                           ttl=ttl, grace=grace, retry=retry, **kwargs)
+        return self._add_descriptor(descriptor)
+
+    def configure(self, options_type: type, source: (dict, str)=None, *, section: str=None):
+        '''
+        register the dataclass `options_type` which bound from `source`:
+        a `dict`, `'env:PREFIX_'`, or the path of a `.json` file or a `.env` file.
+        `section` is the dotted path of the nested section, like `'app.db'`.
+
+        the source is loaded once and shared by all the options from it,
+        the string values are converted by the field types.
+        inject `T` to get the current value, or `Options[T]` to get notified after `reload()`.
+        '''
+        if source is None:
+            source = {}
+        if isinstance(source, str):
+            config_source = self._config_sources.get(source)
+            if config_source is None:
+                config_source = self._config_sources[source] = ConfigSource(source)
+        else:
+            config_source = ConfigSource(source)
+        options = Options[options_type](config_source, section)
+        self._add_descriptor(OptionsDescriptor(options))
+        return self.add(options_type, options.get, LifeTime.transient)
+
+    def shared(self, service_type: type, obj: callable=None, *, name: str=None, **kwargs):
+        '''
+        register a shared type: a singleton which stored in a shared memory segment,
+        so the processes which built from the same `Services` (forked, or by the process executor)
+        attach to it instead of create their own copy.
+
+        `service_type` must implement `__shm_dump__(self) -> bytes`
+        and `__shm_load__(cls, buffer: memoryview)` which create the instance on the buffer without copy.
+        the segment is named by `name` (default is generated), and unlinked after all providers exit.
+        not supported on windows.
+        '''
+        descriptor = self._make_descriptor(service_type, obj or service_type, LifeTime.shared, name=name, **kwargs)
+        return self._add_descriptor(descriptor)
+
     def map(self, service_type: type, target_service_type: type):
         '''
         map a service type to another service type.
@@ -104,16 +264,55 @@ class Services:
         self._name_map[parameter_name] = service_type
         return self
 
+    def copy(self):
+        ''' create a copy of this, so it can be changed without effect the origin. '''
+        services = Services.__new__(Services)
+        services._services = list(self._services)
+        services._name_map = self._name_map.copy()
+        services._options = self._options.copy()
+        services._interceptors = dict((k, list(v)) for k, v in self._interceptors.items())
+        services._config_sources = self._config_sources.copy()
+        services._built = None
+        return services
+
     @property
     def decorator(self):
         return Decorator(self)
 
     def build(self) -> IServiceProvider:
-        self.instance(ParameterTypeResolver(self._name_map))
-        self.transient(IScopedFactory, ScopedFactory)
-        self._services.append(ServiceProviderDescriptor())
-        service_map = ServicesMap(self._services)
-        return ServiceProvider(service_map=service_map)
+        spec = self.copy()
+        # build does not change the services, so the map can be reused until new services are added.
+        key = (len(self._services), self._services[-1], tuple(self._name_map.items()))
+        if self._built is not None and self._built[0] == key:
+            service_map = self._built[1]
+        else:
+            service_map = ServicesMap(self._services + [
+                InstanceDescriptor(ParameterTypeResolver, ParameterTypeResolver(self._name_map)),
+                self._make_descriptor(IScopedFactory, ScopedFactory, LifeTime.transient),
+                ServiceProviderDescriptor(),
+            ])
+            self._built = (key, service_map)
+        options = self._options.copy()
+        if self._interceptors:
+            options['interceptors'] = dict((k, tuple(v)) for k, v in self._interceptors.items())
+        provider = ServiceProvider(service_map=service_map, options=options, services=spec)
+        if 'check_lifetimes' in self._options:
+            LifeTimeChecker(self._options['check_lifetimes']).check(provider.compile())
+        return provider
+
+    def intercept(self, service_type: (type, str), *interceptors: Interceptor):
+        '''
+        wrap the instances of `service_type` with a proxy, which call the methods through `interceptors`.
+        the first interceptor is the outermost, the interceptors which added later are inner.
+
+        the proxy is created with the instance, so it has the same lifetime.
+        the services which registered by `instance()` are not intercepted.
+        '''
+        for interceptor in interceptors:
+            if not isinstance(interceptor, Interceptor):
+                raise TypeError('interceptor must be a Interceptor')
+        self._interceptors.setdefault(service_type, []).extend(interceptors)
+        return self
 
     # ========================== configure ==========================
 
@@ -131,6 +330,54 @@ class Services:
         self.singleton(ICallSiteResolver, CallSiteResolver)
         return self
 
+    def track_scopes(self):
+        '''
+        track the scoped providers, so we can list them by `provider.live_scopes()`
+        and warn `ScopeLeakWarning` when a scope was collected without exit.
+        '''
+        self._options['track_scopes'] = True
+        return self
+
+    def scope_pool(self, max_size: int=64):
+        '''
+        reuse the exited scopes which created by `provider.scope()`, keep `max_size` idle scopes at most.
+
+        a scope is reset when it exit, so do not use it after exit.
+        '''
+        if max_size < 1:
+            raise ValueError('max_size must be greater than 0')
+        self._options['scope_pool'] = max_size
+        return self
+
+    def profile(self):
+        '''
+        measure the construction cost of each service, see `provider.graph()`.
+        '''
+        self._options['profile'] = True
+        return self
+
+    def max_transient_disposables(self, max_count: int=1000, strict=False):
+        '''
+        limit the count of the objects which a provider hold to exit, like the `auto_exit` transients.
+
+        if `strict` is `True`, raise `DisposableLimitError` on exceeded;
+        otherwise warn `DisposableLimitWarning` once for each provider.
+        '''
+        if max_count < 1:
+            raise ValueError('max_count must be greater than 0')
+        self._options['max_transient_disposables'] = max_count
+        self._options['max_transient_disposables_strict'] = strict
+        return self
+
+    def check_lifetimes(self, strict=True):
+        '''
+        detect captive dependencies (a singleton service depend on a scoped service) on `build()`.
+
+        if `strict` is `True`, raise `CaptiveDependencyError`; otherwise warn `CaptiveDependencyWarning`.
+        '''
+        self._options['check_lifetimes'] = strict
+        return self
+
 
 class Decorator:
     def __init__(self, services: Services):
@@ -147,7 +394,7 @@ class Decorator:
             if not isinstance(service_type or obj, type):
                 raise TypeError('service type canbe ignore only args is a type.')
             self._services.singleton(service_type or obj, obj)
-            return obj
+            return mark(obj, LifeTime.singleton, service_type)
         return func
 
     def scoped(self, service_type: type=None):
@@ -155,7 +402,7 @@ class Decorator:
             if not isinstance(service_type or obj, type):
                 raise TypeError('service type canbe ignore only args is a type.')
             self._services.scoped(service_type or obj, obj)
-            return obj
+            return mark(obj, LifeTime.scoped, service_type)
         return func
 
     def transient(self, service_type: type=None):
@@ -163,5 +410,13 @@ class Decorator:
             if not isinstance(service_type or obj, type):
                 raise TypeError('service type canbe ignore only args is a type.')
             self._services.transient(service_type or obj, obj)
-            return obj
+            return mark(obj, LifeTime.transient, service_type)
+        return func
+
+    def weak(self, service_type: type=None):
+        def func(obj):
+            if not isinstance(service_type or obj, type):
+                raise TypeError('service type canbe ignore only args is a type.')
+            self._services.weak(service_type or obj, obj)
+            return mark(obj, LifeTime.weak, service_type)
         return func
@@ -8,23 +8,68 @@
 
 import typing
 from .descriptors import Descriptor
+from .lazy import LazyImport, path_of
 
 class ServicesMap:
     def __init__(self, services: typing.List[Descriptor]):
         self._type_map: typing.Dict[type, typing.List[Descriptor]] = {}
+        # whether some services registered by import path, they are indexed without import.
+        self._has_paths = False
         for service in services:
             ls = self._type_map.get(service.service_type)
             if ls is None:
                 ls = []
                 self._type_map[service.service_type] = ls
+                self._has_paths = self._has_paths or isinstance(service.service_type, str)
             ls.append(service)
+        if self._has_paths:
+            self._orders = dict((id(s), i) for i, s in enumerate(services))
+            self._paths = dict((path_of(t), t) for t in self._type_map if isinstance(t, type))
+            self._merged: typing.Dict[tuple, typing.List[Descriptor]] = {} # (path, type) to merged services
 
-    def get(self, service_type: type) -> Descriptor:
+    def _lookup(self, service_type) -> typing.List[Descriptor]:
+        if not self._has_paths:
+            return self._type_map.get(service_type)
+
+        if isinstance(service_type, type):
+            path, typ = path_of(service_type), service_type
+            if path not in self._type_map:
+                # the types which has the same path (like `<locals>`) are not merged to each other.
+                return self._type_map.get(typ)
+        elif isinstance(service_type, str):
+            path, typ = service_type, self._paths.get(service_type)
+        else:
+            return self._type_map.get(service_type)
+
+        key = (path, typ)
+        merged = self._merged.get(key)
+        if merged is None and key not in self._merged:
+            # merge the services which registered by type and by import path.
+            merged = list(self._type_map.get(path) or ())
+            if typ is not None:
+                merged.extend(self._type_map.get(typ) or ())
+            merged.sort(key=lambda x: self._orders[id(x)])
+            merged = self._merged[key] = merged or None
+        return merged
+
+    def get(self, service_type: (type, str)) -> Descriptor:
         '''return None is not found.'''
-        ls = self._type_map.get(service_type)
+        ls = self._lookup(service_type)
         if ls:
             return ls[-1] # has one item at least.
 
-    def getall(self, service_type: type) -> typing.List[Descriptor]:
+    def getall(self, service_type: (type, str)) -> typing.List[Descriptor]:
         '''return None is not found.'''
-        return self._type_map.get(service_type)
+        return self._lookup(service_type)
+
+    def service_types(self) -> typing.Iterable[type]:
+        return self._type_map.keys()
+
+    def descriptors(self) -> typing.Iterable[Descriptor]:
+        '''iter all descriptors by registration order of each service type.'''
+        for ls in self._type_map.values():
+            yield from ls
+
+    def lazy_imports(self) -> typing.List[LazyImport]:
+        '''get the factories which registered by import path.'''
+        return [d.lazy_import for d in self.descriptors() if getattr(d, 'lazy_import', None) is not None]
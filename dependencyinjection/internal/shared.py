@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+#
+# ----------
+
+import atexit
+import contextlib
+import os
+import struct
+import tempfile
+import typing
+from multiprocessing import shared_memory, resource_tracker
+
+try:
+    import fcntl
+except ImportError: # windows, see `check_protocol()`.
+    fcntl = None
+
+# the max count of the attached providers in all processes.
+MAX_REFERENCES = 64
+# the header of the segment: the size of the payload and the pids of the attached providers (`0` for free).
+_HEADER = struct.Struct(f'<Q{MAX_REFERENCES}q')
+
+DUMP_METHOD = '__shm_dump__'
+LOAD_METHOD = '__shm_load__'
+
+
+def check_protocol(service_type: type):
+    '''
+    a shared service must implement `__shm_dump__(self) -> bytes` (or any bytes-like object)
+    and `__shm_load__(cls, buffer: memoryview)` which create the instance on the buffer without copy.
+
+    the shared services require `fcntl` for the lock between the processes, so windows is not supported.
+    '''
+    if fcntl is None:
+        raise NotImplementedError('shared services are not supported on this platform.')
+    if not callable(getattr(service_type, LOAD_METHOD, None)):
+        raise TypeError(f'{service_type} must implement {LOAD_METHOD}(cls, buffer) to be shared.')
+
+
+@contextlib.contextmanager
+def _process_lock(name: str):
+    ''' a lock between the processes by a lock file. '''
+    path = os.path.join(tempfile.gettempdir(), f'{name}.lock')
+    with open(path, 'a+b') as fp:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+
+def _remove_lock_file(name: str):
+    with contextlib.suppress(OSError):
+        os.unlink(os.path.join(tempfile.gettempdir(), f'{name}.lock'))
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    # the segment is unlinked by the attached pids, not by the resource tracker of each process.
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory') # pylint: disable=W0212
+    except Exception: # pylint: disable=W0703
+        pass
+
+
+def _is_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedSegment:
+    '''
+    a named shared memory segment which hold the dumped bytes of a shared service.
+
+    the first process create it, the others attach to it;
+    the last one which release it unlink it.
+
+    the header record the pid of each reference, so the references of the processes which exited
+    without release (like `os._exit()` or killed) are dropped by the next one which attach or release it.
+    '''
+
+    def __init__(self, name: str):
+        self.name = name
+        self._shm: shared_memory.SharedMemory = None
+
+    @property
+    def size(self) -> int:
+        return _HEADER.unpack_from(self._shm.buf)[0] if self._shm is not None else 0
+
+    @property
+    def refcount(self) -> int:
+        if self._shm is None:
+            return 0
+        return sum(1 for pid in _HEADER.unpack_from(self._shm.buf)[1:] if pid and _is_alive(pid))
+
+    @staticmethod
+    def _update(shm, add: bool) -> int:
+        ''' add or remove a reference of the current process, drop the dead ones; returns the count of references. '''
+        size, *pids = _HEADER.unpack_from(shm.buf)
+        pids = [pid for pid in pids if pid and _is_alive(pid)]
+        if add:
+            if len(pids) >= MAX_REFERENCES:
+                raise RuntimeError(f'too many references of the shared memory {shm.name}')
+            pids.append(os.getpid())
+        elif os.getpid() in pids:
+            pids.remove(os.getpid())
+        _HEADER.pack_into(shm.buf, 0, size, *pids, *([0] * (MAX_REFERENCES - len(pids))))
+        return len(pids)
+
+    def attach_or_create(self, dump: typing.Callable[[], bytes]) -> memoryview:
+        ''' attach to the segment, or create it from `dump()` if it does not exist; returns the payload. '''
+        with _process_lock(self.name):
+            try:
+                shm = shared_memory.SharedMemory(name=self.name)
+            except FileNotFoundError:
+                data = memoryview(dump()).cast('B')
+                shm = shared_memory.SharedMemory(name=self.name, create=True,
+                                                 size=_HEADER.size + data.nbytes)
+                shm.buf[_HEADER.size:_HEADER.size + data.nbytes] = data
+                _HEADER.pack_into(shm.buf, 0, data.nbytes, *([0] * MAX_REFERENCES))
+            _untrack(shm)
+            self._update(shm, True)
+            self._shm = shm
+        # released at exit if the provider is not exited, the forked processes inherit it.
+        atexit.register(self.release)
+        size = _HEADER.unpack_from(shm.buf)[0]
+        return shm.buf[_HEADER.size:_HEADER.size + size].toreadonly()
+
+    def retain(self):
+        ''' add a reference of the current process, like a forked process inherit the segment. '''
+        with _process_lock(self.name):
+            self._update(self._shm, True)
+
+    def release(self):
+        ''' remove a reference, unlink the segment if no one use it. '''
+        shm, self._shm = self._shm, None
+        if shm is None:
+            return
+        atexit.unregister(self.release)
+        with _process_lock(self.name):
+            if not self._update(shm, False):
+                # `unlink()` unregister it from the resource tracker.
+                resource_tracker.register(shm._name, 'shared_memory') # pylint: disable=W0212
+                shm.unlink()
+                _remove_lock_file(self.name)
+        try:
+            shm.close()
+        except BufferError:
+            # the instance still use the buffer, the memory is unmapped after it is collected.
+            shm._mmap = None # pylint: disable=W0212
+            shm.close()
+
+    def stats(self) -> dict:
+        return {
+            'name': self.name,
+            'size': self.size,
+            'refcount': self.refcount,
+        }